@@ -0,0 +1,280 @@
+import hashlib
+import json
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# newest synthetic transaction time, every wallet's history spans the 7 days before it
+BASE_TIME = 1_700_000_000
+HISTORY_SPAN = 7 * 24 * 3600
+SOL_MINT = 'So11111111111111111111111111111111111111112'
+TIMEFRAMES = ['5m', '15m', '30m', '1h', '2h', '3h', '4h', '5h', '6h', '12h', '24h']
+
+
+class FakeApiConfig:
+    # Shape of the synthetic data and how badly the fake APIs behave
+    def __init__(self, top_trader_pages=10, wallets_per_page=100, trending_tokens=10, token_top_traders=20,
+                 trade_pages=3, trades_per_page=50, history_pages=2, mints=500, latency=0.0, rate_429=0.0):
+        self.top_trader_pages = top_trader_pages
+        self.wallets_per_page = wallets_per_page
+        self.trending_tokens = trending_tokens
+        self.token_top_traders = token_top_traders
+        self.trade_pages = trade_pages
+        self.trades_per_page = trades_per_page
+        self.history_pages = history_pages
+        self.mints = [f'Mint{i:040d}' for i in range(mints)]
+        self.latency = latency
+        self.rate_429 = rate_429
+
+
+def rng_for(*parts):
+    # deterministic randomness per entity, so repeated requests see the same data
+    return random.Random(hashlib.md5('/'.join(map(str, parts)).encode()).hexdigest())
+
+
+def wallet_summary(wallet):
+    rng = rng_for('summary', wallet)
+    invested = rng.uniform(1000, 50000)
+    return {'winPercentage': rng.uniform(20, 95), 'total': invested * rng.uniform(-0.5, 3), 'totalInvested': invested}
+
+
+def launch_time(config, mint):
+    # ms, like pool createdAt
+    return int((BASE_TIME - rng_for('launch', mint).uniform(0, 30 * 24 * 3600)) * 1000)
+
+
+def history_length(config):
+    # one page past the 7 day window so the analyzer sees where its history ends
+    return config.history_pages * 100 + 100
+
+
+def synthetic_swap(config, wallet, index):
+    # index 0 is the newest transaction, every token is bought (odd index) and later sold (even index)
+    block_time = int(BASE_TIME - index * HISTORY_SPAN / (config.history_pages * 100))
+    mint = config.mints[rng_for('history', wallet, index // 2).randrange(len(config.mints))]
+    sol_amount = round(rng_for('amount', wallet, index).uniform(0.1, 5), 4)
+    return block_time, mint, sol_amount, index % 2 == 1
+
+
+def history_transaction(config, wallet, index, raw):
+    block_time, mint, sol_amount, is_buy = synthetic_swap(config, wallet, index)
+    sol = {'symbol': 'SOL', 'token_address': SOL_MINT, 'amount': sol_amount}
+    token = {'symbol': mint[:6], 'token_address': mint, 'amount': 1000.0}
+    swapped = {'in': sol, 'out': token} if is_buy else {'in': token, 'out': sol}
+    tx = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(block_time)),
+        'fee': 0.000005,
+        'status': 'Success',
+        'signatures': [f'{wallet}-{index}'],
+        'type': 'SWAP',
+        'actions': [{'type': 'SWAP', 'info': {'swapper': wallet, 'tokens_swapped': swapped}}],
+    }
+    if raw:
+        # roughly the size of a real raw payload: instruction tree and log messages
+        tx['raw'] = {'blockTime': block_time, 'slot': 250_000_000 - index}
+        tx['raw']['meta'] = {'fee': 5000, 'logMessages': [f'Program log: Instruction: Swap {i} ' + 'x' * 60 for i in range(30)]}
+        tx['raw']['transaction'] = {'message': {'instructions': [{'programId': mint, 'data': 'y' * 120, 'accounts': [wallet] * 12} for _ in range(6)]}}
+    return tx
+
+
+def rpc_transaction(config, signature):
+    # getTransaction result (jsonParsed) for the same swap as history_transaction
+    wallet, index = signature.rsplit('-', 1)
+    index = int(index)
+    if index >= history_length(config):
+        return None
+    block_time, mint, sol_amount, is_buy = synthetic_swap(config, wallet, index)
+    fee = 5000
+    lamports = 10 * 10 ** 9
+    sol_change = -int(sol_amount * 10 ** 9) if is_buy else int(sol_amount * 10 ** 9)
+
+    def token_balance(amount):
+        # a zero token balance comes back with a null uiAmount, like on a real node
+        return [{'accountIndex': 1, 'mint': mint, 'owner': wallet, 'uiTokenAmount': {'uiAmount': amount, 'decimals': 6}}]
+
+    return {
+        'blockTime': block_time,
+        'slot': 250_000_000 - index,
+        'transaction': {
+            'signatures': [signature],
+            'message': {'accountKeys': [{'pubkey': wallet, 'signer': True, 'writable': True}, {'pubkey': f'{wallet[:8]}{mint[-8:]}', 'signer': False, 'writable': True}]},
+        },
+        'meta': {
+            'err': None,
+            'fee': fee,
+            'preBalances': [lamports, 2039280],
+            'postBalances': [lamports + sol_change - fee, 2039280],
+            'preTokenBalances': token_balance(None if is_buy else 1000.0),
+            'postTokenBalances': token_balance(1000.0 if is_buy else None),
+        },
+    }
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes, without this every keep-alive response waits on a delayed ack
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        config = self.server.config
+        self.server.count_request()
+        if config.latency:
+            time.sleep(config.latency)
+        if config.rate_429 and random.random() < config.rate_429:
+            return self.send_json(429, {'error': 'rate limited'}, {'Retry-After': '0.1'})
+
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path
+        if path.startswith('/top-traders/all/'):
+            return self.send_json(200, self.top_traders(config, int(path.rsplit('/', 1)[1])))
+        if path.startswith('/top-traders/'):
+            return self.send_json(200, self.token_top_traders(config, path.rsplit('/', 1)[1]))
+        if path.startswith('/tokens/trending/'):
+            return self.send_json(200, self.trending(config, path.rsplit('/', 1)[1]))
+        if path.startswith('/tokens/'):
+            mint = path.rsplit('/', 1)[1]
+            return self.send_json(200, {'token': {'mint': mint}, 'pools': [{'createdAt': launch_time(config, mint)}]})
+        if path.startswith('/trades/'):
+            return self.send_json(200, self.trades(config, path.rsplit('/', 1)[1], int(params.get('cursor') or 0)))
+        if path.startswith('/pnl/'):
+            return self.send_json(200, {'summary': wallet_summary(path.rsplit('/', 1)[1])})
+        if path == '/sol/v1/transaction/history':
+            return self.send_json(200, self.history(config, params))
+        return self.send_json(404, {'error': f'unknown endpoint {path}'})
+
+    def top_traders(self, config, page):
+        wallets = [f'Wallet{page:06d}{i:06d}' for i in range(config.wallets_per_page)]
+        return {'wallets': [{'wallet': wallet, 'summary': wallet_summary(wallet)} for wallet in wallets], 'hasNext': page < config.top_trader_pages}
+
+    def token_top_traders(self, config, mint):
+        traders = []
+        for i in range(config.token_top_traders):
+            wallet = f'Trader{mint[-6:]}{i:06d}'
+            summary = wallet_summary(wallet)
+            traders.append({'wallet': wallet, 'total': summary['total'], 'total_invested': summary['totalInvested']})
+        return traders
+
+    def trending(self, config, timeframe):
+        # every timeframe shares half of its tokens with the next one
+        offset = TIMEFRAMES.index(timeframe) * (config.trending_tokens // 2) if timeframe in TIMEFRAMES else 0
+        mints = config.mints[offset:offset + config.trending_tokens]
+        return [{'token': {'name': mint[:6], 'mint': mint}, 'pools': [{'createdAt': launch_time(config, mint)}]} for mint in mints]
+
+    def trades(self, config, mint, cursor):
+        trades = [{'wallet': f'Trader{mint[-6:]}{cursor * config.trades_per_page + i:06d}'} for i in range(config.trades_per_page)]
+        return {'trades': trades, 'nextCursor': cursor + 1, 'hasNextPage': cursor + 1 < config.trade_pages}
+
+    def history(self, config, params):
+        wallet = params['account']
+        tx_num = int(params.get('tx_num', 100))
+        raw = params.get('enable_raw', 'false') == 'true'
+        before = params.get('before_tx_signature')
+        start = int(before.rsplit('-', 1)[1]) + 1 if before else 0
+        end = min(start + tx_num, history_length(config))
+        return {'success': True, 'result': [history_transaction(config, wallet, index, raw) for index in range(start, end)]}
+
+    def do_POST(self):
+        # Solana JSON-RPC stub: getSignaturesForAddress and getTransaction, single calls or batches
+        config = self.server.config
+        self.server.count_request()
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if config.latency:
+            time.sleep(config.latency)
+        if config.rate_429 and random.random() < config.rate_429:
+            return self.send_json(429, {'error': 'rate limited'}, {'Retry-After': '0.1'})
+        if urlparse(self.path).path != '/rpc':
+            return self.send_json(404, {'error': f'unknown endpoint {self.path}'})
+        if isinstance(body, list):
+            return self.send_json(200, [self.rpc_call(config, call) for call in body])
+        return self.send_json(200, self.rpc_call(config, body))
+
+    def rpc_call(self, config, call):
+        params = call.get('params', [])
+        if call['method'] == 'getSignaturesForAddress':
+            result = self.signatures(config, params[0], params[1] if len(params) > 1 else {})
+        elif call['method'] == 'getTransaction':
+            result = rpc_transaction(config, params[0])
+        else:
+            return {'jsonrpc': '2.0', 'id': call.get('id'), 'error': {'code': -32601, 'message': 'Method not found'}}
+        return {'jsonrpc': '2.0', 'id': call.get('id'), 'result': result}
+
+    def signatures(self, config, wallet, options):
+        before = options.get('before')
+        until = options.get('until')
+        start = int(before.rsplit('-', 1)[1]) + 1 if before else 0
+        end = min(start + options.get('limit', 1000), history_length(config))
+        result = []
+        for index in range(start, end):
+            signature = f'{wallet}-{index}'
+            if signature == until:
+                break
+            block_time = synthetic_swap(config, wallet, index)[0]
+            result.append({'signature': signature, 'slot': 250_000_000 - index, 'blockTime': block_time, 'err': None})
+        return result
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default listen backlog of 5 makes concurrent clients wait on SYN retries
+    request_queue_size = 1024
+
+    def __init__(self, address, config):
+        super().__init__(address, FakeApiHandler)
+        self.config = config
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+
+def start_fake_server(config, port=0):
+    # serve on a background thread, returns the server and its base url
+    server = FakeApiServer(('127.0.0.1', port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def serve(config, port):
+    FakeApiServer(('127.0.0.1', port), config).serve_forever()
+
+
+def start_fake_server_process(config):
+    # serve from a separate process so building responses does not compete with the analyzer for the GIL
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = multiprocessing.Process(target=serve, args=(config, port), daemon=True)
+    process.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process, f'http://127.0.0.1:{port}'
+
+
+if __name__ == '__main__':
+    server, base_url = start_fake_server(FakeApiConfig(), 8765)
+    print(f'Fake Solana Tracker / Shyft API listening on {base_url}')
+    threading.Event().wait()
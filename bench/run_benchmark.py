@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench.fake_server import FakeApiConfig, start_fake_server_process
+
+# number of top-trader pages (100 wallets each) per scenario
+SCENARIOS = {'1k': 10, '10k': 100, '100k': 1000}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run the full pipeline against a local fake Solana Tracker / Shyft server')
+    parser.add_argument('--scenario', choices=SCENARIOS, default='1k')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every fake API response')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--history-pages', type=int, default=2, help='Shyft history pages per wallet within the 7 day window')
+    parser.add_argument('--trade-pages', type=int, default=3, help='trade pages per trending token')
+    parser.add_argument('--history-backend', choices=['shyft', 'rpc'], default='shyft', help='fetch wallet histories from the fake Shyft API or the fake JSON-RPC node')
+    parser.add_argument('--shyft-raw', action='store_true', help='request raw transactions and events from Shyft (lean mode off)')
+    parser.add_argument('--rate-limit', type=float, default=1000, help='requests per second per provider')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--output', help='also write the report to this JSON file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = FakeApiConfig(top_trader_pages=SCENARIOS[args.scenario], trade_pages=args.trade_pages,
+                           history_pages=args.history_pages, latency=args.latency, rate_429=args.rate_429)
+    server, base_url = start_fake_server_process(config)
+
+    # the analyzer reads its configuration from the environment at import time
+    workdir = tempfile.mkdtemp(prefix='wallet-analyzer-bench-')
+    os.chdir(workdir)
+    os.environ.update({
+        'SOLANA_TRACKER_API_URL': base_url,
+        'SHYFT_API_URL': base_url,
+        'SOLANA_TRACKER_API_KEYS': 'bench-key',
+        'SHYFT_API_KEYS': 'bench-key',
+        'SOLANA_TRACKER_RATE_LIMIT': str(args.rate_limit),
+        'SHYFT_RATE_LIMIT': str(args.rate_limit),
+        'HISTORY_BACKEND': args.history_backend,
+        'SHYFT_LEAN_MODE': 'false' if args.shyft_raw else 'true',
+        'RPC_URLS': f'{base_url}/rpc',
+        'RPC_RATE_LIMIT': str(args.rate_limit),
+        'MAX_CONCURRENCY': str(args.concurrency),
+        'METRICS_INTERVAL': '3600',
+    })
+    import fetch_and_analyze_wallets as analyzer
+    logging.getLogger().setLevel(logging.WARNING)
+
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        asyncio.run(analyzer.run_pipeline())
+    elapsed = time.perf_counter() - start
+    server.terminate()
+
+    summary = analyzer.metrics.summary()
+    report = {
+        'scenario': args.scenario,
+        'history_backend': args.history_backend,
+        'wall_seconds': round(elapsed, 3),
+        'requests': summary['requests'],
+        'requests_per_second': round(summary['requests'] / elapsed, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'stages': {name: {'count': stage['count'], 'seconds': stage['sum'], 'avg_seconds': stage['avg']} for name, stage in summary['stages'].items()},
+        'endpoints': {label: {'requests': endpoint['requests'], 'bytes': endpoint['bytes'], 'rate_limited': endpoint['rate_limited'], 'avg_latency': endpoint['latency_seconds']['avg']} for label, endpoint in summary['endpoints'].items()},
+        'workdir': workdir,
+    }
+
+    print(f"Scenario {report['scenario']}: {report['wall_seconds']}s wall, {report['requests']} requests ({report['requests_per_second']} req/s), peak RSS {report['peak_rss_mb']} MB")
+    for name, stage in report['stages'].items():
+        print(f"  stage {name}: {stage['count']} x {stage['avg_seconds']}s (total {stage['seconds']}s)")
+    for label, endpoint in report['endpoints'].items():
+        print(f"  endpoint {label}: {endpoint['requests']} requests, {endpoint['bytes']} bytes, {endpoint['rate_limited']} rate limited, avg latency {endpoint['avg_latency']}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
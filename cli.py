@@ -0,0 +1,216 @@
+import argparse
+import os
+import sys
+
+# Only the standard library is imported up front, the analyzer (httpx) is imported by the subcommand that needs
+# it, numpy once PnL summaries are filtered and pandas once a batch of transactions is analyzed. Progress goes to stderr and the
+# wallets that pass a stage to stdout, one per line, so stages can be piped into each other:
+#   python cli.py discover | python cli.py pnl | python cli.py sniping
+# or, resumable and spread over several processes through the job queue in the database:
+#   python cli.py discover | python cli.py work - --processes 4
+
+# wallet lists a stage reads from the results database when no wallets are given
+DEFAULT_WALLETS = {
+    'pnl': 'pnl_checked_at IS NULL',
+    'sniping': 'profitable_and_winning = 1',
+}
+
+# job kinds of the job queue, same order as fetch_and_analyze_wallets.JOB_KINDS
+JOB_KINDS = ['pnl', 'sync', 'sniping']
+
+# report lists
+REPORT_WALLETS = {
+    'discovered': None,
+    'profitable': 'profitable_and_winning = 1',
+    'qualified': 'profitable_and_winning = 1 AND passes = 1',
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Find profitable Solana wallets that are not sniping. Without a subcommand every stage runs as one pipeline.')
+    subcommands = parser.add_subparsers(dest='command')
+    subcommands.add_parser('discover', help='collect candidate wallets from top traders and trending tokens')
+    for name, help in [('pnl', 'check the PnL summary of wallets'), ('sniping', 'analyze the transactions of wallets for sniping and scalping')]:
+        subcommand = subcommands.add_parser(name, help=help)
+        subcommand.add_argument('wallets', nargs='*', help='wallet addresses, - reads them from stdin')
+        subcommand.add_argument('-f', '--file', action='append', default=[], help='file with one wallet per line, can be repeated')
+    work = subcommands.add_parser('work', help='run the PnL, sync and sniping jobs of the job queue until it is drained, resuming where earlier workers stopped')
+    work.add_argument('wallets', nargs='*', help='wallets to queue first, - reads them from stdin')
+    work.add_argument('-f', '--file', action='append', default=[], help='file with one wallet per line, can be repeated')
+    work.add_argument('--stage', choices=JOB_KINDS, default='pnl', help='queue the given wallets for this stage (default: pnl)')
+    work.add_argument('--kinds', default=','.join(JOB_KINDS), help='comma separated job kinds this host works on (default: all)')
+    work.add_argument('-p', '--processes', type=int, help='worker processes sharing the rate limits (default: WORKER_PROCESSES)')
+    warm = subcommands.add_parser('warm-launch-times', help='index the launch times of tokens up front, prints the mints that failed')
+    warm.add_argument('wallets', metavar='mints', nargs='*', help='token mint addresses, - reads them from stdin')
+    warm.add_argument('-f', '--file', action='append', default=[], help='file with one mint per line, can be repeated')
+    subcommands.add_parser('watch', help='keep the verdicts of the found wallets current from websocket notifications')
+    report = subcommands.add_parser('report', help='print the wallets stored in the results database')
+    report.add_argument('--list', choices=list(REPORT_WALLETS), default='qualified', help='which wallets to print (default: qualified)')
+    report.add_argument('--export', help='also write every stored result to this .parquet or .csv file')
+    return parser.parse_args(argv)
+
+
+def read_wallets(lines):
+    return [wallet for line in lines for wallet in line.split()]
+
+
+def input_wallets(args, piped_stdin=True):
+    # wallets from the arguments and files, from stdin for - (or when it is piped, with piped_stdin), else None
+    wallets = [wallet for wallet in args.wallets if wallet != '-']
+    for file in args.file:
+        with open(file) as f:
+            wallets.extend(read_wallets(f))
+    if '-' in args.wallets:
+        wallets.extend(read_wallets(sys.stdin))
+    elif piped_stdin and not wallets and not args.file and not sys.stdin.isatty():
+        # cron and subprocess callers have no tty, an empty stdin there means no wallets were given
+        wallets = read_wallets(sys.stdin)
+        if not wallets:
+            return None
+    elif not wallets and not args.file:
+        return None
+    # keep the order, drop duplicates
+    return list(dict.fromkeys(wallets))
+
+
+def setup():
+    from dotenv import load_dotenv
+    load_dotenv()
+    debug = os.getenv('DEBUG', 'false').lower() == 'true'
+    import logging
+    logging.basicConfig(level=logging.DEBUG if debug else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def stored_wallets(analyzer, where):
+    from utils.results_store import ResultsStore
+    results_store = ResultsStore(analyzer.database_file)
+    try:
+        return results_store.wallets(where)
+    finally:
+        results_store.close()
+
+
+def run_stage(stage):
+    # stage progress goes to stderr, stdout only gets the wallets
+    import asyncio
+    from contextlib import redirect_stdout
+    with redirect_stdout(sys.stderr):
+        return asyncio.run(stage)
+
+
+def print_wallets(wallets):
+    for wallet in wallets:
+        print(wallet)
+
+
+def print_job_counts(analyzer):
+    for kind, counts in analyzer.job_counts().items():
+        print(f"{kind} jobs: " + ', '.join(f"{count} {status}" for status, count in sorted(counts.items())), file=sys.stderr)
+
+
+def run_worker(kinds, rate_share, worker=None):
+    # entry point of a worker process
+    setup()
+    import fetch_and_analyze_wallets as analyzer
+    try:
+        run_stage(analyzer.run_job_worker(kinds, rate_share, worker))
+    except KeyboardInterrupt:
+        pass
+
+
+def work(analyzer, args):
+    kinds = [kind.strip() for kind in args.kinds.split(',') if kind.strip()]
+    unknown = set(kinds) - set(JOB_KINDS)
+    if unknown:
+        print(f"Unknown job kinds: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    # queuing wallets is optional here, so stdin is only read for -
+    wallets = input_wallets(args, piped_stdin=False)
+    if wallets:
+        added = analyzer.enqueue_jobs(args.stage, wallets)
+        print(f"Queued {added} of {len(wallets)} wallets for {args.stage}", file=sys.stderr)
+
+    processes = args.processes or analyzer.worker_processes
+    if processes <= 1:
+        run_worker(kinds, 1)
+    else:
+        # every process gets its share of the per key rate limits
+        import multiprocessing
+        context = multiprocessing.get_context('spawn')
+        workers = [context.Process(target=run_worker, args=(kinds, 1 / processes, worker)) for worker in range(1, processes + 1)]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            # the workers got the same interrupt and hand back their jobs
+            for worker in workers:
+                worker.join()
+
+    print_job_counts(analyzer)
+    return 0
+
+
+def report(analyzer, args):
+    from utils.results_store import ResultsStore
+    if not os.path.exists(analyzer.database_file):
+        print(f"No results yet, {analyzer.database_file} does not exist", file=sys.stderr)
+        return 1
+    results_store = ResultsStore(analyzer.database_file)
+    try:
+        counts = results_store.conn.execute('SELECT COUNT(*), COUNT(pnl_checked_at), SUM(profitable_and_winning = 1), COUNT(sniping_checked_at), SUM(profitable_and_winning = 1 AND passes = 1) FROM wallet_results').fetchone()
+        print("{} wallets, {} PnL checked, {} profitable and winning, {} sniping checked, {} qualified".format(*[count or 0 for count in counts]), file=sys.stderr)
+        print_job_counts(analyzer)
+        print_wallets(results_store.wallets(REPORT_WALLETS[args.list]))
+        if args.export:
+            results_store.export(args.export)
+            print(f"Exported results to {args.export}", file=sys.stderr)
+    finally:
+        results_store.close()
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup()
+    import fetch_and_analyze_wallets as analyzer
+
+    if args.command == 'report':
+        return report(analyzer, args)
+    if args.command == 'work':
+        return work(analyzer, args)
+
+    if args.command == 'discover':
+        print_wallets(run_stage(analyzer.run_discovery_stage()))
+    elif args.command in DEFAULT_WALLETS:
+        wallets = input_wallets(args)
+        if wallets is None:
+            wallets = stored_wallets(analyzer, DEFAULT_WALLETS[args.command])
+        if not wallets:
+            print("No wallets to check", file=sys.stderr)
+            return 0
+        if args.command == 'pnl':
+            print_wallets(run_stage(analyzer.run_pnl_stage(wallets)))
+        else:
+            results = run_stage(analyzer.run_sniping_stage(wallets))
+            print_wallets(results.index[results['passes']])
+    elif args.command == 'warm-launch-times':
+        mints = input_wallets(args)
+        if not mints:
+            print("No mints to index", file=sys.stderr)
+            return 0
+        print_wallets(run_stage(analyzer.warm_launch_index(mints)))
+    elif args.command == 'watch':
+        import asyncio
+        asyncio.run(analyzer.watch_wallets())
+    else:
+        import asyncio
+        asyncio.run(analyzer.run_pipeline())
+        print("Done!")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,499 +1,839 @@
-from time import sleep
-import requests
-import pandas as pd
-from datetime import datetime, timedelta, timezone
+import asyncio
+from datetime import timedelta
 import logging
 import sys
+import time
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Create 'outputs' folder if it doesn't exist
+from utils.async_engine import ProviderClient, create_http_client, run_bounded
+from utils.key_pool import KeyPool
+from utils.http_client import RequestBudget, RetryPolicy
+from utils.launch_index import LaunchTimeIndex, launch_time_from_token_info
+from utils.transaction_store import TransactionStore
+from utils.summary_cache import WalletSummaryCache, summary_from_top_trader
+from utils.wallet_index import WalletIndex
+from utils.results_store import ResultsStore
+from utils.job_queue import JobQueue
+from utils.filters import WalletFilter, profitability_rules, summary_columns
+from utils.shyft_stream import iter_history_records
+from utils.rpc_history import MAX_SIGNATURES_PER_CALL, RpcClient, parse_rpc_transaction
+from utils.pipeline import feed, merge, run_workers, iterate_batches
+from utils.metrics import metrics
+from utils.thresholds import DEFAULT_THRESHOLDS
+
+# importing this module has no side effects, cli.py loads the .env file and sets up logging before importing it
+# and every stage creates the 'outputs' folder when it starts
 outputs_folder = 'outputs'
-os.makedirs(outputs_folder, exist_ok=True)
-
-# Set up logging
-DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
-logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Constants
-TRANSACTION_HISTORY_API_URL = os.getenv('TRANSACTION_HISTORY_API_URL')
-ALL_TOKENS_API_URL = os.getenv('ALL_TOKENS_API_URL')
-WALLET_BALANCE_API_URL = os.getenv('WALLET_BALANCE_API_URL')
 NETWORK = os.getenv('NETWORK')
-ACCOUNT = os.getenv('ACCOUNT')
-API_KEY = os.getenv('API_KEY')
 
 # Solana Tracker
 solana_tracker_api_key = os.getenv('SOLANA_TRACKER_API_KEY')
-top_traders_api_url = 'https://data.solanatracker.io/top-traders/all/'
-top_traders_for_token_api_url = 'https://data.solanatracker.io/top-traders/'
-wallet_details_api_url = 'https://data.solanatracker.io/wallet/'
-trending_tokens_api_url = 'https://data.solanatracker.io/tokens/trending/'
-wallet_pnl_api_url = 'https://data.solanatracker.io/pnl/'
-token_info_api_url = 'https://data.solanatracker.io/tokens/'
-trades_api_url = 'https://data.solanatracker.io/trades/'
+solana_tracker_api_keys = [key.strip() for key in (os.getenv('SOLANA_TRACKER_API_KEYS') or solana_tracker_api_key or '').split(',') if key.strip()]
+solana_tracker_api_url = os.getenv('SOLANA_TRACKER_API_URL', 'https://data.solanatracker.io')
+top_traders_api_url = f'{solana_tracker_api_url}/top-traders/all/'
+top_traders_for_token_api_url = f'{solana_tracker_api_url}/top-traders/'
+wallet_details_api_url = f'{solana_tracker_api_url}/wallet/'
+trending_tokens_api_url = f'{solana_tracker_api_url}/tokens/trending/'
+wallet_pnl_api_url = f'{solana_tracker_api_url}/pnl/'
+token_info_api_url = f'{solana_tracker_api_url}/tokens/'
+trades_api_url = f'{solana_tracker_api_url}/trades/'
 
 # Shyft
 shyft_api_key = os.getenv('SHYFT_API_KEY')
-transaction_history_api_url = "https://api.shyft.to/sol/v1/transaction/history"
+shyft_api_keys = [key.strip() for key in (os.getenv('SHYFT_API_KEYS') or shyft_api_key or '').split(',') if key.strip()]
+shyft_api_url = os.getenv('SHYFT_API_URL', 'https://api.shyft.to')
+transaction_history_api_url = f"{shyft_api_url}/sol/v1/transaction/history"
+# lean mode leaves out the raw transactions and events, the analyzer only reads the parsed actions and the timestamp
+shyft_lean_mode = os.getenv('SHYFT_LEAN_MODE', 'true').lower() == 'true'
+
+# Transaction history backend: 'shyft', or 'rpc' for getSignaturesForAddress + batched getTransaction calls
+# spread over the comma separated RPC_URLS, each with RPC_RATE_LIMIT requests per second
+history_backend = os.getenv('HISTORY_BACKEND', 'shyft').lower()
+rpc_urls = [url.strip() for url in os.getenv('RPC_URLS', 'https://api.mainnet-beta.solana.com').split(',') if url.strip()]
+rpc_rate_limit = float(os.getenv('RPC_RATE_LIMIT', '5'))
+rpc_batch_size = int(os.getenv('RPC_BATCH_SIZE', '50'))
+rpc_batches_in_flight = int(os.getenv('RPC_BATCHES_IN_FLIGHT', '4'))
 
 # General
 do_not_check_list = ["So11111111111111111111111111111111111111112","7vfCXTUXx5WJV5JADk17DUJ4ksgau7utNKj4b963voxs","3NZ9JMVBmGAqocybic2c7LQCJScmgsAZ6vQqTDzcqmJh","Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB","JUPyiwrYJFskUPiHa7hkeR8VUtAeFoSYbKedZNsDvCN"]
-winrate_min = os.getenv('WINRATE_MIN')
-winrate_max = os.getenv('WINRATE_MAX')
-roi_min = os.getenv('ROI_MIN')
-invested_min = os.getenv('INVESTED_MIN')
+winrate_min = float(os.getenv('WINRATE_MIN', '50'))
+winrate_max = float(os.getenv('WINRATE_MAX', '85'))
+roi_min = float(os.getenv('ROI_MIN', '80'))
+invested_min = float(os.getenv('INVESTED_MIN', '5000'))
+# the same profitability rules are applied to top-traders pages, per-token top traders and /pnl/ summaries,
+# with separate rejection counts for each
+profitability_filters = {source: WalletFilter(profitability_rules(winrate_min, winrate_max, roi_min, invested_min)) for source in ['top-traders', 'token-top-traders', 'pnl']}
+
+# Watch mode: websocket logsSubscribe on the qualified and candidate wallets, notifications are coalesced for WATCH_DEBOUNCE seconds
+rpc_ws_url = os.getenv('RPC_WS_URL', 'wss://api.mainnet-beta.solana.com')
+watch_subscriptions_per_connection = int(os.getenv('WATCH_SUBSCRIPTIONS_PER_CONNECTION', '100'))
+watch_debounce = float(os.getenv('WATCH_DEBOUNCE', '2'))
+
+# Trending token harvest (timeframes fetched in parallel, trade pages per token stop early once a page has no new wallets)
+trending_timeframes = [timeframe.strip() for timeframe in os.getenv('TRENDING_TIMEFRAMES', '5m,1h,6h,24h').split(',') if timeframe.strip()]
+trending_max_trade_pages = int(os.getenv('TRENDING_MAX_TRADE_PAGES', '10'))
+
+# Async engine (requests per second allowed by each provider's plan, per API key)
+solana_tracker_rate_limit = float(os.getenv('SOLANA_TRACKER_RATE_LIMIT', '1'))
+shyft_rate_limit = float(os.getenv('SHYFT_RATE_LIMIT', '1'))
+max_concurrency = int(os.getenv('MAX_CONCURRENCY', '20'))
+
+# HTTP retries (exponential backoff capped at MAX_BACKOFF seconds) and the max number of requests per run (0 = unlimited)
+retry_policy = RetryPolicy(int(os.getenv('MAX_RETRIES', '5')), float(os.getenv('BACKOFF_BASE', '0.5')), float(os.getenv('MAX_BACKOFF', '30')))
+request_budget = RequestBudget(int(os.getenv('MAX_REQUESTS_PER_RUN', '0')))
+
+# Pipeline (queue sizes bound memory, sniping analysis runs on batches of wallets)
+pipeline_queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', '1000'))
+sniping_batch_size = int(os.getenv('SNIPING_BATCH_SIZE', '50'))
+sniping_batch_wait = float(os.getenv('SNIPING_BATCH_WAIT', '2'))
+
+# Behavioral heuristics, each threshold can be overridden with its upper case name (e.g. MIN_AVG_HOLD_MINUTES)
+heuristic_thresholds = {name: float(os.getenv(name.upper(), default)) for name, default in DEFAULT_THRESHOLDS.items()}
 
 # Files
 potential_output_file = f'{outputs_folder}/potential_wallets.txt'
 profitable_and_winning_output_file = f'{outputs_folder}/profitable_and_winning_wallets.txt'
 profitable_and_winning_and_not_sniping_output_file = f'{outputs_folder}/profitable_and_winning_and_not_sniping_wallets.txt'
+database_file = os.getenv('DATABASE_FILE', f'{outputs_folder}/wallets.db')
+# every stage's per-wallet results are kept in the database, the wallet lists above are rewritten from it after a run
+# and RESULTS_EXPORT_FILE (.parquet or .csv) optionally gets the full table
+results_export_file = os.getenv('RESULTS_EXPORT_FILE')
 
-def get_token_info(api_url, api_key, token_address):
-    headers = {
-        'x-api-key': api_key
-    }
-    response = requests.get(api_url+f'{token_address}', headers=headers)
-    response.raise_for_status()  # Raise an error for bad status codes
-    return response.json()
-
-def get_trending_tokens(api_url, api_key, timeframe='24h'):
-    headers = {
-        'x-api-key': api_key
-    }
-    response = requests.get(api_url+f'{timeframe}', headers=headers)
-    response.raise_for_status()  # Raise an error for bad status codes
-    return response.json()
-
-def get_top_traders_for_token(api_url, api_key, token_address):
-    headers = {
-        'x-api-key': api_key
-    }
-    response = requests.get(api_url+f'{token_address}', headers=headers)
-    response.raise_for_status()  # Raise an error for bad status codes
-    return response.json()
+# Wallet PnL summaries from top-traders pages and /pnl/ are reused for SUMMARY_CACHE_TTL seconds instead of calling /pnl/ again
+summary_cache_ttl = float(os.getenv('SUMMARY_CACHE_TTL', '21600'))
 
-def get_trades_for_token(api_url, api_key, token_address, cursor=None):
-    headers = {
-        'x-api-key': api_key
-    }
-    params = {
-        'parseJupiter': True,
-        'hideArb': True,
-        'cursor': cursor
-    }
-    response = requests.get(api_url+f'{token_address}', params=params, headers=headers)
-    response.raise_for_status()  # Raise an error for bad status codes
-    return response.json()
+# Wallets already evaluated within WALLET_RECHECK_INTERVAL seconds are skipped when discovered again
+wallet_recheck_interval = float(os.getenv('WALLET_RECHECK_INTERVAL', '86400'))
 
-def get_wallet_pnl(api_url, api_key, wallet_address):
-    headers = {
-        'x-api-key': api_key
-    }
-    params = {
-        'showHistoricPnL': True,
-        'hideDetails': True
-    }
-    response = requests.get(api_url+f'{wallet_address}', params=params, headers=headers)
-    response.raise_for_status()  # Raise an error for bad status codes
-    return response.json()
+# Job queue (python cli.py work): PnL checks, transaction syncs and sniping analyses are durable jobs in the database,
+# leased for JOB_LEASE_SECONDS (extended while a worker is alive) and given up after JOB_MAX_ATTEMPTS failures;
+# workers with nothing to claim wait JOB_POLL_INTERVAL seconds for other workers' jobs to finish or their leases to expire
+job_lease_seconds = float(os.getenv('JOB_LEASE_SECONDS', '300'))
+job_max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+job_poll_interval = float(os.getenv('JOB_POLL_INTERVAL', '5'))
+worker_processes = int(os.getenv('WORKER_PROCESSES', '1'))
 
-def get_wallet_data(api_url, api_key, page):
-    headers = {
-        'x-api-key': api_key
-    }
-    response = requests.get(api_url+f'{page}', headers=headers)
-    response.raise_for_status()  # Raise an error for bad status codes
-    return response.json()
+# Metrics (JSON summary and Prometheus textfile, rewritten every METRICS_INTERVAL seconds during a run)
+metrics_json_file = os.getenv('METRICS_JSON_FILE', f'{outputs_folder}/metrics.json')
+metrics_prometheus_file = os.getenv('METRICS_PROMETHEUS_FILE', f'{outputs_folder}/metrics.prom')
+metrics_interval = float(os.getenv('METRICS_INTERVAL', '30'))
 
-def get_wallet_details(api_url, api_key, wallet_address):
-    headers = {
-        'x-api-key': api_key
-    }
-    response = requests.get(api_url+f'{wallet_address}', headers=headers)
-    response.raise_for_status()  # Raise an error for bad status codes
-    return response.json()
+def create_outputs_folder():
+    os.makedirs(outputs_folder, exist_ok=True)
 
 def filter_profitable_wallets(wallets):
-    # Filter wallets with win rate over 50%
-    return [
-        wallet for wallet in wallets 
-        if wallet.get('summary', {}).get('winPercentage') is not None 
-        and wallet['summary']['winPercentage'] >= winrate_min 
-        and wallet['summary']['winPercentage'] <= winrate_max
-        and wallet['summary']['total'] > 0
-        and (wallet['summary']['total'] / wallet['summary']['totalInvested']) > 0.80
-    ]
+    # top-traders page entries, judged on their summary
+    return profitability_filters['top-traders'].select(wallets, summary_columns([wallet.get('summary') or {} for wallet in wallets]))
 
 def filter_profitable_top_wallets(wallets):
-    # Filter wallets with win rate over 50%
-    return [
-        wallet['wallet'] for wallet in wallets 
-        if wallet['total'] > 0 
-        and wallet['total_invested'] > invested_min
-        and (wallet['total'] / wallet['total_invested']) * 100 > roi_min
-    ]
-
-def save_to_txt(wallets, output_file):
-    with open(output_file, "a") as f:
-        for wallet in wallets:
-            f.write(f"{wallet}\n")
-
-def get_latest_transaction_signature(api_url, api_key, network, account):
-    logger.debug(f"Fetching latest transaction for account: {account}")
-    headers = {"x-api-key": api_key}
-    params = {
+    # per-token top traders only report totals, the win rate rules do not apply
+    summaries = [{'total': wallet.get('total'), 'totalInvested': wallet.get('total_invested')} for wallet in wallets]
+    return [wallet['wallet'] for wallet in profitability_filters['token-top-traders'].select(wallets, summary_columns(summaries, win_rate=False))]
+
+def is_profitable_and_winning(pnl):
+    return bool(profitability_filters['pnl'].evaluate(summary_columns([pnl.get('summary') or {}]))[0])
+
+def load_from_txt(output_file):
+    if not os.path.exists(output_file):
+        return set()
+    with open(output_file, "r") as f:
+        return set(f.read().splitlines())
+
+def history_params(network, account, tx_num):
+    enable = "false" if shyft_lean_mode else "true"
+    return {
         "network": network,
         "account": account,
-        "tx_num": 1,
-        "enable_raw": "true",
-        "enable_events": "true"
+        "tx_num": tx_num,
+        "enable_raw": enable,
+        "enable_events": enable
     }
-    response = requests.get(api_url, headers=headers, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        if data.get("result"):
-            signature = data["result"][0]["signatures"][0]
-            block_time = data["result"][0]["raw"]["blockTime"]
-            logger.debug(f"Latest transaction signature: {signature}, block time: {block_time}")
-            return signature, block_time
-    logger.error("Failed to fetch the latest transaction")
-    return None, None
-
-def parse_transaction(tx):
-    block_time = tx.get('raw', {}).get('blockTime')
-    blocktime_utc = datetime.fromtimestamp(block_time, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S') if block_time else "N/A"
-    signature = tx.get('signatures', ['N/A'])[0]
-    slot = tx.get('raw', {}).get('slot', 'N/A')
-    status = tx.get('status', 'N/A')
-    compute_unit = tx.get('raw', {}).get('meta', {}).get('computeUnitsConsumed', 'N/A')
-    fee = tx.get('raw', {}).get('meta', {}).get('fee', 'N/A')
-   
-    token_name = 'N/A'
-    token_in = 'N/A'
-    profit = 'N/A'
-    if tx.get('actions') and len(tx['actions']) > 0:
-        action = tx['actions'][0]
-        token_in_info = action.get('info', {}).get('tokens_swapped', {}).get('in', {})
-        token_name = token_in_info.get('symbol', 'N/A')
-        token_in = token_in_info.get('amount', 'N/A')
-
-        ###
-        token_in_name = token_in_info.get('symbol', 'N/A')
-        token_in_address = token_in_info.get('token_address', 'N/A')
-        token_in_amount = token_in_info.get('amount', 'N/A')
-        token_out_info = action.get('info', {}).get('tokens_swapped', {}).get('out', {})
-        token_out_name = token_out_info.get('symbol', 'N/A')
-        token_out_address = token_out_info.get('token_address', 'N/A')
-        token_out_amount = token_out_info.get('amount', 'N/A')
-
-        token_out = action.get('info', {}).get('tokens_swapped', {}).get('out', {}).get('amount', 'N/A')
-        if token_in != 'N/A' and token_out != 'N/A':
-            try:
-                profit = float(token_out) - float(token_in)
-            except ValueError:
-                profit = 'N/A'
-   
-    memo = 'N/A'
-    instructions = tx.get('raw', {}).get('transaction', {}).get('message', {}).get('instructions', [])
-    for instruction in instructions:
-        if instruction.get('parsed'):
-            parsed = instruction['parsed']
-            if isinstance(parsed, str) and parsed.strip():
-                memo = parsed.strip()
-                break
-   
-    # get all the buys
-    type = 'N/A'
-    if token_in_name == 'SOL':
-        type = 'buy'
-    elif token_in_name != 'SOL' and token_in_name != 'N/A':
-        type = 'sell'
-
-    return {"type": type, "blocktime_utc": blocktime_utc, "token_out_name": token_out_name, "token_out_address": token_out_address, "token_out_amount": token_out_amount, "token_in_name": token_in_name, "token_in_address": token_in_address, "token_in_amount": token_in_amount}
-
-def fetch_and_parse_transactions(api_url, api_key, network, account, time_delta):
-    latest_signature, latest_block_time = get_latest_transaction_signature(api_url, api_key, network, account)
-    if not latest_signature:
-        logger.error("Failed to fetch the latest transaction.")
-        return []
-
-    end_time = datetime.fromtimestamp(latest_block_time)
-    start_time = end_time - time_delta if time_delta else datetime.min
-    logger.debug(f"Fetching transactions from {start_time} to {end_time}")
+
+async def sync_wallet_transactions(shyft, transaction_store, network, account, time_delta):
+    # only fetch transactions newer than the last sync, the rest is already in the store
+    newest_signature, newest_block_time = transaction_store.get_sync_state(account)
 
     transactions = []
-    before_tx_signature = latest_signature
-    api_calls = 0   
+    before_tx_signature = None
+    start_block_time = None
+    api_calls = 0
     continue_fetching = True
 
     while continue_fetching:
         api_calls += 1
-        logger.debug(f"API call #{api_calls}, before_tx_signature: {before_tx_signature}")
-        params = {
-            "network": network,
-            "account": account,
-            "tx_num": 100,
-            "enable_raw": "true",
-            "enable_events": "true",
-            "before_tx_signature": before_tx_signature
-        }
-        response = requests.get(api_url, headers={"x-api-key": api_key}, params=params)
-        
-        if response.status_code != 200:
-            logger.error(f"Error in API request: {response.status_code}, {response.text}")
+        params = history_params(network, account, 100)
+        if before_tx_signature:
+            params["before_tx_signature"] = before_tx_signature
+
+        # pages are parsed while they download, only the swap fields are kept and the rest of a page
+        # is not read once it reaches transactions that are already synced or too old
+        page_size = 0
+        async with shyft.stream(transaction_history_api_url, params=params) as response:
+            async for tx in iter_history_records(response):
+                page_size += 1
+                if start_block_time is None:
+                    start_block_time = tx.block_time - time_delta.total_seconds() if time_delta else 0
+                if tx.signature == newest_signature or (newest_block_time and tx.block_time < newest_block_time) or tx.block_time < start_block_time:
+                    continue_fetching = False
+                    break
+                transactions.append(tx)
+                before_tx_signature = tx.signature
+        if page_size == 0:
             break
 
-        data = response.json()
-        batch = data.get("result", [])
+    transaction_store.add(account, transactions)
+    if start_block_time is not None:
+        transaction_store.prune(account, start_block_time)
+    logger.debug(f"{account}: {len(transactions)} new transactions synced with {api_calls} API calls")
+    return transaction_store.load(account)
+
+async def sync_wallet_transactions_rpc(rpc, transaction_store, account, time_delta):
+    # same as sync_wallet_transactions, with signatures listed first and the transactions fetched in batches
+    newest_signature, newest_block_time = transaction_store.get_sync_state(account)
+
+    signatures = []
+    before = None
+    start_block_time = None
+    api_calls = 0
+    continue_fetching = True
 
+    while continue_fetching:
+        api_calls += 1
+        batch = await rpc.get_signatures(account, before=before, until=newest_signature)
         if not batch:
-            logger.debug("No more transactions to fetch")
             break
 
-        logger.debug(f"Fetched {len(batch)} transactions in this batch")
-
-        batch_start_time = datetime.fromtimestamp(batch[-1]["raw"]["blockTime"])
-        batch_end_time = datetime.fromtimestamp(batch[0]["raw"]["blockTime"])
+        if start_block_time is None:
+            start_block_time = (batch[0]['blockTime'] or 0) - time_delta.total_seconds() if time_delta else 0
 
-        for tx in batch:
-            tx_time = datetime.fromtimestamp(tx["raw"]["blockTime"])
-            if start_time <= tx_time <= end_time:
-                transactions.append(parse_transaction(tx))
-            elif tx_time < start_time:
+        for info in batch:
+            block_time = info['blockTime'] or 0
+            if (newest_block_time and block_time < newest_block_time) or block_time < start_block_time:
                 continue_fetching = False
                 break
+            signatures.append(info['signature'])
 
-        if continue_fetching and batch:
-            before_tx_signature = batch[-1]["signatures"][0]
-        else:
+        if len(batch) < MAX_SIGNATURES_PER_CALL:
             break
-
-        # Update progress
-        progress_msg = f"\rAPI calls: {api_calls}, Parsed transactions from {batch_start_time} to {batch_end_time}"
-        sys.stdout.write(progress_msg)
-        sys.stdout.flush()
-
-    print()  # New line after progress updates
-    transactions.reverse()  # Reverse to get chronological order
-    logger.info(f"Total API calls made: {api_calls}")
-    logger.info(f"Total transactions fetched: {len(transactions)}")
-    return transactions
-  
-def get_balance_sol(api_url, api_key, account, network="mainnet"):
-    headers = {"x-api-key": api_key}
-    params = {
-        "network": network,
-        "wallet": account
-    }
-    try:
-        response = requests.get(api_url, headers=headers, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("success"):
-                return data.get("result", [])
-        logger.error("Failed to fetch all tokens")
-        return []
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching sol balances: {e}")
-        return []
-    
-def get_all_tokens(api_url, api_key, network, account):
-    headers = {"x-api-key": api_key}
-    params = {
-        "network": network,
-        "wallet": account
+        before = batch[-1]['signature']
+
+    # raises if any transaction could not be fetched, the sync state only moves once the whole range is stored
+    fetched = await rpc.get_transactions(signatures, rpc_batch_size, rpc_batches_in_flight)
+    transactions = [parse_rpc_transaction(fetched[signature], account) for signature in signatures]
+    api_calls += (len(signatures) + rpc_batch_size - 1) // rpc_batch_size
+
+    transaction_store.add(account, transactions)
+    if start_block_time is not None:
+        transaction_store.prune(account, start_block_time)
+    logger.debug(f"{account}: {len(transactions)} new transactions synced with {api_calls} RPC requests")
+    return transaction_store.load(account)
+
+def sync_wallet_history(history, transaction_store, account, time_delta):
+    if isinstance(history, RpcClient):
+        return sync_wallet_transactions_rpc(history, transaction_store, account, time_delta)
+    return sync_wallet_transactions(history, transaction_store, 'mainnet-beta', account, time_delta)
+
+def create_provider_clients(client, rate_share=1):
+    # every provider gets its own pool of keys, each key with its own rate limit
+    # (rate_share splits the limits between worker processes that use the same keys)
+    solana_tracker = ProviderClient(client, KeyPool(solana_tracker_api_keys, solana_tracker_rate_limit * rate_share), retry_policy, request_budget)
+    # the history client is either Shyft or a pool of RPC nodes, see HISTORY_BACKEND
+    if history_backend == 'rpc':
+        history = RpcClient(client, KeyPool(rpc_urls, rpc_rate_limit * rate_share), retry_policy, request_budget)
+    else:
+        history = ProviderClient(client, KeyPool(shyft_api_keys, shyft_rate_limit * rate_share), retry_policy, request_budget)
+    return solana_tracker, history
+
+def log_key_usage(**providers):
+    for name, provider in providers.items():
+        for usage in provider.key_pool.usage():
+            logger.info(f"{name} key {usage['key']}: {usage['requests']} requests, {usage['rate_limited']} rate limited, {usage['errors']} errors")
+
+def worker_file(path, worker):
+    # outputs/metrics.json -> outputs/metrics.worker2.json
+    root, ext = os.path.splitext(path)
+    return f'{root}.worker{worker}{ext}'
+
+def metrics_files(worker=None):
+    # job queue worker processes each write their own files, the Prometheus samples get a worker label
+    if worker is None:
+        return metrics_json_file, metrics_prometheus_file, None
+    return worker_file(metrics_json_file, worker), worker_file(metrics_prometheus_file, worker), {'worker': worker}
+
+def write_metrics(worker=None):
+    json_file, prometheus_file, labels = metrics_files(worker)
+    metrics.write(json_file, prometheus_file, labels)
+
+def finish(*steps):
+    # run every step of a shutdown even if one fails, so the run is still closed and the stores released
+    for step in steps:
+        try:
+            step()
+        except Exception:
+            logger.exception("Error while finishing the run")
+
+def export_results(results_store):
+    results_store.export_wallets(potential_output_file)
+    results_store.export_wallets(profitable_and_winning_output_file, 'profitable_and_winning = 1')
+    results_store.export_wallets(profitable_and_winning_and_not_sniping_output_file, 'profitable_and_winning = 1 AND passes = 1')
+    if results_export_file:
+        try:
+            results_store.export(results_export_file)
+        except ImportError as e:
+            logger.error(f"Failed to export results to {results_export_file}: {e}")
+
+def pnl_result(wallet, summary, source, passed):
+    total = summary.get('total')
+    total_invested = summary.get('totalInvested')
+    return {
+        'wallet': wallet,
+        'win_percentage': summary.get('winPercentage'),
+        'total': total,
+        'total_invested': total_invested,
+        'roi': total / total_invested * 100 if total is not None and total_invested else None,
+        'pnl_source': source,
+        'profitable_and_winning': passed,
+        'pnl_checked_at': time.time()
     }
-    try:
-        response = requests.get(api_url, headers=headers, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("success"):
-                # only keep tokens with address EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v and So11111111111111111111111111111111111111112
-                return [token for token in data.get("result", []) if token.get("address") in ["EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v", "So11111111111111111111111111111111111111112"]]
-        logger.error("Failed to fetch all tokens")
-
-        return []
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching token balances: {e}")
-        return []
-    
-if __name__ == "__main__":
-    # get top trader wallets
+
+async def check_wallet_pnl(solana_tracker, summary_cache, results_store, wallet):
+    # a fresh summary from an earlier top-traders page or /pnl/ call saves the request
+    summary = summary_cache.get_complete(wallet)
+    source = 'cache'
+    if summary is None:
+        with metrics.stage('pnl'):
+            pnl = await solana_tracker.get_json(wallet_pnl_api_url + wallet, params={'showHistoricPnL': True, 'hideDetails': True})
+        summary = pnl.get('summary') or {}
+        source = 'api'
+        if summary:
+            summary_cache.put(wallet, summary)
+    passed = is_profitable_and_winning({'summary': summary})
+    results_store.upsert([pnl_result(wallet, summary, source, passed)])
+    return passed
+
+def log_summary_cache(summary_cache):
+    logger.info(f"PnL summary cache: {summary_cache.hits} hits, {summary_cache.misses} /pnl/ calls")
+    for source, wallet_filter in profitability_filters.items():
+        logger.info(f"Profitability filter ({source}): {wallet_filter.report()}")
+
+async def run_pnl_stage(wallets):
+    create_outputs_folder()
+    summary_cache = WalletSummaryCache(database_file, summary_cache_ttl)
+    wallet_index = WalletIndex(database_file, wallet_recheck_interval)
+    results_store = ResultsStore(database_file)
+    results_store.start_run()
+    profitable = []
+    async with create_http_client(max_concurrency) as client:
+        solana_tracker, _ = create_provider_clients(client)
+        async for wallet, passed, error in run_bounded(wallets, lambda wallet: check_wallet_pnl(solana_tracker, summary_cache, results_store, wallet), max_concurrency):
+            if error:
+                print("Error fetching PnL for wallet:", wallet)
+                print(error)
+            elif passed:
+                print("Wallet is profitable and winning:", wallet)
+                wallet_index.mark_profitable(wallet)
+                profitable.append(wallet)
+            else:
+                wallet_index.mark_checked([wallet])
+        log_key_usage(solana_tracker=solana_tracker)
+    log_summary_cache(summary_cache)
+    write_metrics()
+    results_store.finish_run()
+    export_results(results_store)
+    summary_cache.close()
+    wallet_index.close()
+    results_store.close()
+    return profitable
+
+async def warm_launch_index(mints):
+    # fetch the launch times of a list of tokens up front (python cli.py warm-launch-times), returns the mints that failed
+    create_outputs_folder()
+    launch_index = LaunchTimeIndex(database_file)
+    async with create_http_client(max_concurrency) as client:
+        solana_tracker, _ = create_provider_clients(client)
+        failed = await launch_index.warm(mints, lambda mint: solana_tracker.get_json(token_info_api_url + mint), max_concurrency)
+        log_key_usage(solana_tracker=solana_tracker)
+    launch_index.close()
+    if failed:
+        logger.error(f"Failed to fetch launch time for {len(failed)} tokens")
+    write_metrics()
+    return failed
+
+async def evaluate_wallet_batch(solana_tracker, history, launch_index, transaction_store, results_store, wallets):
+    # sync the transactions of all wallets concurrently
+    wallet_transactions = {}
+
+    async def sync(wallet):
+        with metrics.stage('transaction_sync'):
+            return await sync_wallet_history(history, transaction_store, wallet, timedelta(days=7))
+
+    async for wallet, transactions, error in run_bounded(wallets, sync, max_concurrency):
+        if error:
+            print("Error fetching transactions for wallet:", wallet)
+            print(error)
+            continue
+        if not transactions:
+            print("No transactions found for wallet:", wallet)
+        wallet_transactions[wallet] = transactions
+
+    return await analyze_transactions(solana_tracker, launch_index, results_store, wallet_transactions)
+
+async def analyze_transactions(solana_tracker, launch_index, results_store, wallet_transactions):
+    # pandas is only loaded once there are transactions to analyze
+    from utils.heuristics import build_transaction_frame, first_buys, compute_features, apply_heuristics
+
+    # launch times are only needed for the distinct tokens the wallets bought
+    frame = build_transaction_frame(wallet_transactions)
+    mints = first_buys(frame)['token'].unique()
+    with metrics.stage('launch_times'):
+        failed = await launch_index.warm(mints, lambda mint: solana_tracker.get_json(token_info_api_url + mint), max_concurrency)
+    if failed:
+        logger.error(f"Failed to fetch launch time for {len(failed)} tokens")
+
+    with metrics.stage('heuristics'):
+        features = compute_features(frame, launch_index.get_many(mints), heuristic_thresholds, wallets=list(wallet_transactions))
+        verdicts = apply_heuristics(features, heuristic_thresholds)
+    results = features.join(verdicts)
+    results_store.upsert_frame(results, sniping_checked_at=time.time())
+    return results
+
+async def analyze_wallet_batch(solana_tracker, history, launch_index, transaction_store, results_store, wallets):
+    results = await evaluate_wallet_batch(solana_tracker, history, launch_index, transaction_store, results_store, wallets)
+    for wallet in results.index[results['passes']]:
+        print("Wallet is profitable and winning and not sniping:", wallet)
+    return results
+
+async def run_sniping_stage(wallets):
+    create_outputs_folder()
+    launch_index = LaunchTimeIndex(database_file)
+    transaction_store = TransactionStore(database_file)
+    results_store = ResultsStore(database_file)
+    results_store.start_run()
+    async with create_http_client(max_concurrency) as client:
+        solana_tracker, history = create_provider_clients(client)
+        results = await analyze_wallet_batch(solana_tracker, history, launch_index, transaction_store, results_store, wallets)
+        log_key_usage(solana_tracker=solana_tracker, **{history_backend: history})
+    write_metrics()
+    results_store.finish_run()
+    export_results(results_store)
+    launch_index.close()
+    transaction_store.close()
+    results_store.close()
+    return results
+
+async def discover_top_traders(solana_tracker, summary_cache):
     page = 1
     next_page = True
-
     while next_page:
         try:
             print(f"Fetching wallets (page {page})...")
-            # Fetch wallet data from the API
-            wallets = get_wallet_data(top_traders_api_url, solana_tracker_api_key, page)
-
-            # Filter the wallets to include only profitable ones
-            profitable_wallets = filter_profitable_wallets(wallets['wallets'])
-            profitable_wallets_list = [item['wallet'] for item in profitable_wallets]
-
-            print(f"Found {len(profitable_wallets_list)} profitable wallets")
-            # Save the profitable wallets to a CSV file
-            save_to_txt(profitable_wallets_list, potential_output_file)
-
-            next_page = wallets['hasNext']
-            page += 1
-
-            # Sleep for 1 second to avoid rate limiting (free tier has a limit of 1 request per second)
-            sleep(1)
+            wallets = await solana_tracker.get_json(top_traders_api_url + str(page))
         except Exception as e:
+            # the client already retried with backoff, give up on this source
             print("Error fetching wallets")
             print(e)
-    print(f"Top trader wallets saved\n")
-
-    # get top traders for trending tokens   
-    tokens = get_trending_tokens(trending_tokens_api_url, solana_tracker_api_key)
-
-    for token in tokens[:1]:
-        potential_wallets = []
-        if token not in do_not_check_list:
-            print(token['token']['name'], token['token']['mint'])
+            break
 
+        # every summary on the page is cached, the PnL stage reuses them instead of calling /pnl/
+        summary_cache.put_many([(item['wallet'], item['summary']) for item in wallets['wallets'] if item.get('summary')])
+
+        # Filter the wallets to include only profitable ones
+        profitable_wallets = filter_profitable_wallets(wallets['wallets'])
+        print(f"Found {len(profitable_wallets)} profitable wallets")
+        # whole pages, so the wallet index is updated once per page
+        yield [item['wallet'] for item in profitable_wallets]
+
+        next_page = wallets['hasNext']
+        page += 1
+
+async def fetch_trending_tokens(solana_tracker, launch_index):
+    # all timeframes at once, a token trending in several timeframes is only harvested once
+    results = await asyncio.gather(*[solana_tracker.get_json(trending_tokens_api_url + timeframe) for timeframe in trending_timeframes], return_exceptions=True)
+    tokens = {}
+    for timeframe, result in zip(trending_timeframes, results):
+        if isinstance(result, Exception):
+            print(f"Error fetching trending tokens ({timeframe})")
+            print(result)
+            continue
+        for token in result:
+            tokens.setdefault(token['token']['mint'], token)
+
+    # trending tokens come with their pools, so their launch times are indexed for free
+    launch_index.put_many([(mint, launch_time_from_token_info(token)) for mint, token in tokens.items() if token.get('pools')])
+    return [token for mint, token in tokens.items() if mint not in do_not_check_list]
+
+async def harvest_token_traders(solana_tracker, summary_cache, token, harvested):
+    mint = token['token']['mint']
+    print(token['token']['name'], mint)
+
+    async def top_traders():
+        try:
+            wallets = await solana_tracker.get_json(top_traders_for_token_api_url + mint)
+        except Exception as e:
+            print("Error fetching top traders for token:", mint)
+            print(e)
+            return []
+        summary_cache.put_many([(item['wallet'], summary_from_top_trader(item)) for item in wallets])
+        return filter_profitable_top_wallets(wallets)
+
+    async def traders():
+        # cursors only come with the previous page, so pages of one token are sequential while tokens run in parallel
+        wallets = []
+        cursor = None
+        for page in range(trending_max_trade_pages):
             try:
-                wallets = get_top_traders_for_token(top_traders_for_token_api_url, solana_tracker_api_key, token['token']['mint'])
-                profitable_wallets = filter_profitable_top_wallets(wallets)
-                potential_wallets = potential_wallets + profitable_wallets
+                params = {'parseJupiter': True, 'hideArb': True}
+                if cursor:
+                    params['cursor'] = cursor
+                trades = await solana_tracker.get_json(trades_api_url + mint, params=params)
             except Exception as e:
-                print("Error fetching top traders for token:", token['token']['mint'])
+                print("Error fetching trades for token:", mint)
                 print(e)
-
-            # sleep for 1 second to avoid rate limiting
-            sleep(1)
-            
-            # get trades for token
-            cursor = None
-            page = 1
-            max_pages = 10
-            next_page = True
-            while next_page and page <= max_pages:
-                try:
-                    trades = get_trades_for_token(trades_api_url, solana_tracker_api_key, token['token']['mint'], cursor)
-                    cursor = trades['nextCursor']
-                    next_page = trades['hasNextPage']
-                    page += 1
-
-                    potential_wallets = potential_wallets + [trade['wallet'] for trade in trades['trades']]
-                except Exception as e:
-                    print("Error fetching trades for token:", token['token']['mint'])
-                    print(e)
-            
-            # sleep for 1 second to avoid rate limiting
-            sleep(1)
-                    
-            save_to_txt(set(potential_wallets), potential_output_file)
-
+                break
+            new_wallets = {trade['wallet'] for trade in trades['trades']} - harvested
+            harvested.update(new_wallets)
+            wallets.extend(new_wallets)
+            # a page without new wallets means the token's active traders are exhausted
+            if not new_wallets or not trades['hasNextPage']:
+                break
+            cursor = trades['nextCursor']
+        return wallets
+
+    top, trades = await asyncio.gather(top_traders(), traders())
+    return top + trades
+
+async def discover_trending_token_traders(solana_tracker, launch_index, summary_cache):
+    tokens = await fetch_trending_tokens(solana_tracker, launch_index)
+    print(f"Harvesting traders of {len(tokens)} trending tokens ({', '.join(trending_timeframes)})")
+    harvested = set()
+    async for token, wallets, error in run_bounded(tokens, lambda token: harvest_token_traders(solana_tracker, summary_cache, token, harvested), max_concurrency):
+        if error:
+            print("Error harvesting traders for token:", token['token']['mint'])
+            print(error)
+            continue
+        yield wallets
+
+async def discover_wallets(solana_tracker, launch_index, summary_cache, wallet_index, results_store):
+    # deduplicated stream of candidate wallets from all sources, minus the ones checked recently
     # Potentially more wallets?
     # https://docs.birdeye.so/reference/get_trader-gainers-losers
-
-    # read from output_file
-    with open(potential_output_file, "r") as f:
-        potential_wallets = f.read().splitlines()
-
-    # rewrite the file with unique wallets
-    with open(potential_output_file, "w") as f:
-        for wallet in set(potential_wallets):
-            f.write(f"{wallet}\n")
-
-    # read from output_file
-    with open(potential_output_file, "r") as f:
-        potential_wallets = f.read().splitlines()
-
-    # iterate over the wallets to test profitability
-    for wallet in potential_wallets:
-        print("Fetching PnL for wallet:", wallet)
+    skipped = 0
+    start = time.monotonic()
+    # both sources run side by side, the trending harvest does not wait for the top-traders pages
+    # the sources yield batches of wallets (a page, a token's traders), each batch costs one commit per store
+    async for wallets in merge(discover_top_traders(solana_tracker, summary_cache), discover_trending_token_traders(solana_tracker, launch_index, summary_cache)):
+        seen = wallet_index.see_many(wallets)
+        discovered_at = time.time()
+        results_store.upsert([{'wallet': wallet, 'discovered_at': discovered_at} for wallet in dict.fromkeys(wallets)])
+        for wallet, new, due in seen:
+            if due:
+                yield wallet
+            elif not new:
+                skipped += 1
+    logger.info(f"Skipped {skipped} wallets already seen in this run or checked in the last {wallet_recheck_interval:.0f} seconds")
+    metrics.record_stage('discovery', time.monotonic() - start)
+
+# job kinds in the order a wallet goes through them, each finished job queues the wallet's next one
+JOB_KINDS = ['pnl', 'sync', 'sniping']
+
+def enqueue_jobs(kind, wallets):
+    # a wallet that is queued again is checked again, unless one of its jobs of this kind is still running
+    create_outputs_folder()
+    job_queue = JobQueue(database_file, job_lease_seconds, job_max_attempts)
+    added = job_queue.enqueue(kind, wallets, requeue=True)
+    job_queue.close()
+    return added
+
+def job_counts():
+    job_queue = JobQueue(database_file, job_lease_seconds, job_max_attempts)
+    counts = job_queue.counts()
+    job_queue.close()
+    return counts
+
+async def run_job_worker(kinds=JOB_KINDS, rate_share=1, worker=None):
+    # claim and run jobs until the queues of these kinds (and the kinds before them) are drained; every finished
+    # job is checkpointed, so a worker that is killed only loses the jobs it held and those are picked up again
+    # once their lease expires
+    create_outputs_folder()
+    job_queue = JobQueue(database_file, job_lease_seconds, job_max_attempts)
+    launch_index = LaunchTimeIndex(database_file)
+    transaction_store = TransactionStore(database_file)
+    summary_cache = WalletSummaryCache(database_file, summary_cache_ttl)
+    wallet_index = WalletIndex(database_file, wallet_recheck_interval)
+    results_store = ResultsStore(database_file)
+    results_store.start_run()
+    held = {kind: set() for kind in JOB_KINDS}
+    finished = {kind: 0 for kind in JOB_KINDS}
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(job_lease_seconds / 3)
+            for kind, wallets in held.items():
+                lost = set(wallets) - set(job_queue.extend(kind, list(wallets)))
+                if lost:
+                    logger.warning(f"Lost the lease on {len(lost)} {kind} jobs")
+
+    async with create_http_client(max_concurrency) as client:
+        solana_tracker, history = create_provider_clients(client, rate_share)
+
+        async def pnl_job(wallet):
+            passed = await check_wallet_pnl(solana_tracker, summary_cache, results_store, wallet)
+            if passed:
+                print("Wallet is profitable and winning:", wallet)
+                wallet_index.mark_profitable(wallet)
+                job_queue.enqueue('sync', [wallet], requeue=True)
+            else:
+                wallet_index.mark_checked([wallet])
+            return passed
+
+        async def sync_job(wallet):
+            with metrics.stage('transaction_sync'):
+                transactions = await sync_wallet_history(history, transaction_store, wallet, timedelta(days=7))
+            job_queue.enqueue('sniping', [wallet], requeue=True)
+            return len(transactions)
+
+        async def run_jobs(kind, wallets):
+            # PnL checks and syncs run concurrently, one result per job
+            job = pnl_job if kind == 'pnl' else sync_job
+            async for wallet, result, error in run_bounded(wallets, job, max_concurrency):
+                if error:
+                    print(f"Error running {kind} job for wallet:", wallet)
+                    print(error)
+                    job_queue.fail(kind, wallet, error)
+                else:
+                    job_queue.complete(kind, wallet, result)
+                    finished[kind] += 1
+                # the lease ends with the job, the heartbeat must not extend it any more
+                held[kind].discard(wallet)
+
+        async def run_sniping_jobs(wallets):
+            # the batch is analyzed from the transactions the sync jobs stored
+            try:
+                results = await analyze_transactions(solana_tracker, launch_index, results_store, {wallet: transaction_store.load(wallet) for wallet in wallets})
+            except Exception as e:
+                print("Error analyzing wallets")
+                print(e)
+                for wallet in wallets:
+                    job_queue.fail('sniping', wallet, e)
+                    held['sniping'].discard(wallet)
+                return
+            wallet_index.mark_checked(list(results.index))
+            for wallet, passes in results['passes'].items():
+                if passes:
+                    print("Wallet is profitable and winning and not sniping:", wallet)
+                job_queue.complete('sniping', wallet, bool(passes))
+                finished['sniping'] += 1
+                held['sniping'].discard(wallet)
+
+        async def work(kind):
+            upstream = JOB_KINDS[:JOB_KINDS.index(kind) + 1]
+            while True:
+                wallets = job_queue.claim(kind, sniping_batch_size if kind == 'sniping' else max_concurrency)
+                if not wallets:
+                    # done once nothing before this stage can queue more work, else wait for other workers
+                    if not job_queue.unfinished(upstream):
+                        return
+                    await asyncio.sleep(job_poll_interval)
+                    continue
+                held[kind].update(wallets)
+                try:
+                    if kind == 'sniping':
+                        await run_sniping_jobs(wallets)
+                    else:
+                        await run_jobs(kind, wallets)
+                finally:
+                    held[kind].difference_update(wallets)
+
+        def release_held():
+            # jobs interrupted by an error or Ctrl+C are handed back right away instead of waiting for the lease
+            for kind, wallets in held.items():
+                job_queue.release(kind, list(wallets))
+
+        keepalive = asyncio.ensure_future(heartbeat())
+        json_file, prometheus_file, labels = metrics_files(worker)
+        exporter = asyncio.ensure_future(metrics.export_periodically(json_file, prometheus_file, metrics_interval, labels))
         try:
-            pnl = get_wallet_pnl(wallet_pnl_api_url, solana_tracker_api_key, wallet)
-            if pnl.get('summary', {}).get('winPercentage') is not None:
-                if pnl['summary']['winPercentage'] >= winrate_min and pnl['summary']['winPercentage'] <= winrate_max:
-                        if pnl['summary']['total'] > 0 and pnl['summary']['totalInvested'] > invested_min:
-                            if (pnl['summary']['total'] / pnl['summary']['totalInvested']) * 100 >= roi_min:
-                                # save to text file
-                                print("Wallet is profitable and winning:", wallet)
-                                with open(profitable_and_winning_output_file, "a") as f:
-                                    f.write(f"{wallet}\n")
-            
-            # sleep for 1 second to avoid rate limiting
-            sleep(1)
-        except Exception as e:
-            print("Error fetching PnL for wallet:", wallet)
-            print(e)
-
-    # Check for minimum balance and avoid snipers (buy on launch)
-    with open(profitable_and_winning_output_file, "r") as f:
-        profitable_and_winning_wallets = f.read().splitlines()
-
-    # rewrite the file with unique wallets
-    with open(profitable_and_winning_output_file, "w") as f:
-        for wallet in set(profitable_and_winning_wallets):
-            f.write(f"{wallet}\n")
-
-    # read from output_file
-    with open(profitable_and_winning_output_file, "r") as f:
-        profitable_and_winning_wallets = f.read().splitlines()
-
-    # iterate over the wallets
-    for wallet in set(profitable_and_winning_wallets):
-        print("Fetching transactions wallet:", wallet)
-        is_sniping = False
-        has_minimum_balance = True
-
-        # TODO: check for minimum balance
-        # get_balance_sol(api_url, api_key, wallet)
-        # TODO: Avoid frequent airdrops
-        # TODO: Avoid multiple buys per token
-        # TODO: Avoid scalpers (trade a lot in less than 2 min)
-        # TODO: Minimum average holding time of 20 min
-        # TODO: Don’t sell more than they buy
-        # TODO: Trading 2-5 times a day
-
+            # the stages run side by side, so network bound PnL checks and syncs overlap with the analysis
+            await asyncio.gather(*[work(kind) for kind in kinds])
+        finally:
+            keepalive.cancel()
+            exporter.cancel()
+            finish(
+                release_held,
+                lambda: log_key_usage(solana_tracker=solana_tracker, **{history_backend: history}),
+                lambda: logger.info("Finished jobs: " + ', '.join(f"{kind}: {count}" for kind, count in finished.items())),
+                lambda: log_summary_cache(summary_cache),
+                lambda: write_metrics(worker),
+                results_store.finish_run,
+                lambda: export_results(results_store),
+                job_queue.close,
+                launch_index.close,
+                transaction_store.close,
+                summary_cache.close,
+                wallet_index.close,
+                results_store.close,
+            )
+
+async def run_discovery_stage():
+    # discovery on its own, returns the wallets that are due for a PnL check
+    create_outputs_folder()
+    launch_index = LaunchTimeIndex(database_file)
+    summary_cache = WalletSummaryCache(database_file, summary_cache_ttl)
+    wallet_index = WalletIndex(database_file, wallet_recheck_interval)
+    results_store = ResultsStore(database_file)
+    results_store.start_run()
+    wallets = []
+    async with create_http_client(max_concurrency) as client:
+        solana_tracker, _ = create_provider_clients(client)
+        async for wallet in discover_wallets(solana_tracker, launch_index, summary_cache, wallet_index, results_store):
+            wallets.append(wallet)
+        log_key_usage(solana_tracker=solana_tracker)
+    log_summary_cache(summary_cache)
+    write_metrics()
+    results_store.finish_run()
+    export_results(results_store)
+    launch_index.close()
+    summary_cache.close()
+    wallet_index.close()
+    results_store.close()
+    return wallets
+
+async def run_pipeline():
+    # discovery -> PnL check -> transaction analysis, wallets flow to the next stage as soon as they pass
+    create_outputs_folder()
+    launch_index = LaunchTimeIndex(database_file)
+    transaction_store = TransactionStore(database_file)
+    summary_cache = WalletSummaryCache(database_file, summary_cache_ttl)
+    wallet_index = WalletIndex(database_file, wallet_recheck_interval)
+    results_store = ResultsStore(database_file)
+    results_store.start_run()
+    pnl_queue = asyncio.Queue(maxsize=pipeline_queue_size)
+    sniping_queue = asyncio.Queue(maxsize=pipeline_queue_size)
+
+    exporter = asyncio.ensure_future(metrics.export_periodically(metrics_json_file, metrics_prometheus_file, metrics_interval))
+
+    async with create_http_client(max_concurrency) as client:
+        solana_tracker, history = create_provider_clients(client)
+
+        async def pnl_worker(wallet):
+            try:
+                passed = await check_wallet_pnl(solana_tracker, summary_cache, results_store, wallet)
+            except Exception as e:
+                print("Error fetching PnL for wallet:", wallet)
+                print(e)
+                return None
+            if not passed:
+                wallet_index.mark_checked([wallet])
+                return None
+            print("Wallet is profitable and winning:", wallet)
+            wallet_index.mark_profitable(wallet)
+            return wallet
+
+        async def sniping_consumer():
+            # TODO: check for minimum balance
+            async for batch in iterate_batches(sniping_queue, sniping_batch_size, sniping_batch_wait):
+                try:
+                    results = await analyze_wallet_batch(solana_tracker, history, launch_index, transaction_store, results_store, batch)
+                except Exception as e:
+                    # a failed batch must not stop the pipeline, its wallets stay due for the next run
+                    print("Error analyzing wallets:", ', '.join(batch))
+                    print(e)
+                    continue
+                # wallets whose transaction sync failed have no result and stay due for the next run
+                wallet_index.mark_checked(list(results.index))
+
+        await asyncio.gather(
+            feed(discover_wallets(solana_tracker, launch_index, summary_cache, wallet_index, results_store), pnl_queue),
+            run_workers(pnl_queue, pnl_worker, max_concurrency, sniping_queue),
+            sniping_consumer()
+        )
+        log_key_usage(solana_tracker=solana_tracker, **{history_backend: history})
+
+    exporter.cancel()
+    log_summary_cache(summary_cache)
+    write_metrics()
+    results_store.finish_run()
+    export_results(results_store)
+    launch_index.close()
+    transaction_store.close()
+    summary_cache.close()
+    wallet_index.close()
+    results_store.close()
+
+async def watch_wallets():
+    # keep the verdicts of the qualified and candidate wallets current from websocket notifications instead of rerunning the pipeline
+    qualified = load_from_txt(profitable_and_winning_and_not_sniping_output_file)
+    wallets = sorted(qualified | load_from_txt(profitable_and_winning_output_file))
+    if not wallets:
+        print("No wallets to watch, run the pipeline first")
+        return
+
+    create_outputs_folder()
+    launch_index = LaunchTimeIndex(database_file)
+    transaction_store = TransactionStore(database_file)
+    results_store = ResultsStore(database_file)
+    results_store.start_run()
+    pending = set()
+    activity = asyncio.Event()
+
+    async def on_activity(wallet, signature):
+        logger.debug(f"{wallet}: new transaction {signature}")
+        pending.add(wallet)
+        activity.set()
+
+    async def on_reconnect(wallets):
+        # notifications sent while disconnected are lost, resync these wallets (only new transactions are fetched)
+        pending.update(wallets)
+        activity.set()
+
+    async def update(solana_tracker, history, batch):
+        results = await evaluate_wallet_batch(solana_tracker, history, launch_index, transaction_store, results_store, batch)
+        for wallet, passes in results['passes'].items():
+            if passes and wallet not in qualified:
+                qualified.add(wallet)
+                print("Wallet is profitable and winning and not sniping:", wallet)
+            elif not passes and wallet in qualified:
+                qualified.discard(wallet)
+                print("Wallet no longer passes the sniping checks:", wallet)
+
+    async def updater(solana_tracker, history):
+        while True:
+            await activity.wait()
+            # one swap usually shows up in several notifications, wait for the burst to settle
+            await asyncio.sleep(watch_debounce)
+            activity.clear()
+            batch = list(pending)
+            pending.clear()
+            for i in range(0, len(batch), sniping_batch_size):
+                try:
+                    await update(solana_tracker, history, batch[i:i + sniping_batch_size])
+                except Exception as e:
+                    print("Error updating wallets")
+                    print(e)
+            # only the sniping verdicts change here, the full export (every discovered wallet) runs once on shutdown
+            results_store.export_wallets(profitable_and_winning_and_not_sniping_output_file, 'profitable_and_winning = 1 AND passes = 1')
+            write_metrics()
+
+    async with create_http_client(max_concurrency) as client:
+        solana_tracker, history = create_provider_clients(client)
+        # bring every wallet up to date first, later updates only sync the new transactions
+        pending.update(wallets)
+        activity.set()
+        from utils.log_watcher import LogWatcher
+        watcher = LogWatcher(rpc_ws_url, wallets, on_activity, on_reconnect, watch_subscriptions_per_connection, retry_policy)
+        print(f"Watching {len(wallets)} wallets ({len(qualified)} qualified)")
         try:
-            transactions = fetch_and_parse_transactions(transaction_history_api_url, shyft_api_key, 'mainnet-beta', wallet, timedelta(days=7))
-
-            if transactions:
-                # get all the buy transactions
-                buy_transactions = [tx for tx in transactions if tx['type'] == 'buy']
-
-                # get unique token_out_address from the list
-                tokens = set([tx['token_out_address'] for tx in buy_transactions])
-                for token in tokens:
-                    # get all the buy transactions for the token
-                    token_buy_transactions = [tx for tx in buy_transactions if tx['token_out_address'] == token]
-
-                    # sort the transactions by blocktime
-                    token_buy_transactions = sorted(token_buy_transactions, key=lambda x: x['blocktime_utc'], reverse=False)
-                    earliest_buy_transaction = datetime.strptime(token_buy_transactions[0]['blocktime_utc'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-
-                    # get the token created time
-                    token_info = get_token_info(token_info_api_url, solana_tracker_api_key, token)
-                    token_pools = token_info['pools']
-                    token_pools_created_at_values = [item.get('createdAt', 9999999999999) for item in token_pools]
-                    token_created_at = datetime.fromtimestamp(min(token_pools_created_at_values) / 1000, tz=timezone.utc)
-
-                    sniping_window = timedelta(minutes=1)                    
-                    if abs(earliest_buy_transaction - token_created_at) <= sniping_window:
-                        is_sniping = True
-            else:
-                print("No transactions found for wallet:", wallet)
-        except Exception as e:
-            print("Error fetching transactions for wallet:", wallet)
-            print(e)
+            await asyncio.gather(watcher.run(), updater(solana_tracker, history))
+        finally:
+            results_store.finish_run()
+            export_results(results_store)
+            launch_index.close()
+            transaction_store.close()
+            results_store.close()
 
-        if not is_sniping and has_minimum_balance:
-            # save to text file
-            print("Wallet is profitable and winning and not sniping:", wallet)
-            with open(profitable_and_winning_and_not_sniping_output_file, "a") as f:
-                f.write(f"{wallet}\n")
-
-    print("Done!")
-    
\ No newline at end of file
+if __name__ == "__main__":
+    # same as `python cli.py`, which also has the per-stage subcommands
+    from cli import main
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from utils.async_engine import run_bounded
+
+
+def collect(items, worker, concurrency):
+    async def run():
+        return [result async for result in run_bounded(items, worker, concurrency)]
+    return asyncio.run(run())
+
+
+def test_every_item_is_run_with_bounded_concurrency():
+    in_flight = []
+
+    async def worker(item):
+        in_flight.append(item)
+        assert len(in_flight) <= 3
+        await asyncio.sleep(0.001 * (item % 4))
+        in_flight.remove(item)
+        if item == 5:
+            raise ValueError(item)
+        return item * 2
+
+    results = collect(range(20), worker, 3)
+    assert sorted(item for item, _, _ in results) == list(range(20))
+    assert all(result == item * 2 for item, result, error in results if item != 5)
+    assert [type(error) for item, _, error in results if item == 5] == [ValueError]
+
+
+def test_items_are_only_taken_when_a_worker_is_free():
+    taken = []
+
+    def items():
+        for item in range(1000):
+            taken.append(item)
+            yield item
+
+    async def worker(item):
+        await asyncio.sleep(0)
+        return item
+
+    async def run():
+        async for item, _, _ in run_bounded(items(), worker, 4):
+            if item == 10:
+                return len(taken)
+
+    # the workers and the bounded result queue hold at most a few items beyond the ones already yielded
+    assert asyncio.run(run()) < 30
+
+
+def test_an_error_of_the_items_iterator_is_raised():
+    def items():
+        yield 1
+        raise RuntimeError('broken source')
+
+    async def worker(item):
+        return item
+
+    with pytest.raises(RuntimeError, match='broken source'):
+        collect(items(), worker, 2)
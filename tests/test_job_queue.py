@@ -0,0 +1,100 @@
+import time
+from utils.job_queue import JobQueue
+
+
+def make_queue(tmp_path, worker_id, lease_seconds=60, max_attempts=3):
+    return JobQueue(str(tmp_path / 'wallets.db'), lease_seconds, max_attempts, worker_id=worker_id)
+
+
+def status(queue, kind, wallet):
+    return queue.conn.execute('SELECT status, attempts, lease_owner FROM jobs WHERE kind = ? AND wallet = ?', (kind, wallet)).fetchone()
+
+
+def test_enqueue_skips_queued_wallets_unless_requeued(tmp_path):
+    queue = make_queue(tmp_path, 'a')
+    assert queue.enqueue('pnl', ['w1', 'w2']) == 2
+    assert queue.enqueue('pnl', ['w1', 'w3']) == 1
+    queue.claim('pnl', 1)
+    queue.complete('pnl', 'w1')
+    # a finished job is reset by requeue, pending and leased ones are left alone
+    assert queue.enqueue('pnl', ['w1', 'w2'], requeue=True) == 1
+    assert status(queue, 'pnl', 'w1') == ('pending', 0, None)
+
+
+def test_claim_never_hands_out_a_leased_job_twice(tmp_path):
+    a = make_queue(tmp_path, 'a')
+    b = make_queue(tmp_path, 'b')
+    a.enqueue('pnl', ['w1', 'w2', 'w3'])
+    assert a.claim('pnl', 2) == ['w1', 'w2']
+    assert b.claim('pnl', 2) == ['w3']
+    assert b.claim('pnl', 2) == []
+    assert status(a, 'pnl', 'w1') == ('leased', 1, 'a')
+
+
+def test_extend_only_keeps_leases_the_worker_still_holds(tmp_path):
+    a = make_queue(tmp_path, 'a')
+    b = make_queue(tmp_path, 'b')
+    a.enqueue('pnl', ['w1', 'w2', 'w3'])
+    a.claim('pnl', 2)
+    b.claim('pnl', 1)
+    a.complete('pnl', 'w1', True)
+    # completed jobs and jobs leased by another worker are not extended
+    assert a.extend('pnl', ['w1', 'w2', 'w3']) == ['w2']
+
+
+def test_complete_and_fail_need_the_lease(tmp_path):
+    a = make_queue(tmp_path, 'a')
+    b = make_queue(tmp_path, 'b')
+    a.enqueue('pnl', ['w1'])
+    a.claim('pnl', 1)
+    assert not b.complete('pnl', 'w1')
+    assert not b.fail('pnl', 'w1', 'error')
+    assert a.complete('pnl', 'w1', {'passed': True})
+    assert status(a, 'pnl', 'w1') == ('done', 1, None)
+    assert a.unfinished(['pnl']) == 0
+
+
+def test_failed_jobs_are_retried_until_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, 'a', max_attempts=2)
+    queue.enqueue('sync', ['w1'])
+    queue.claim('sync', 1)
+    queue.fail('sync', 'w1', 'timeout')
+    assert status(queue, 'sync', 'w1') == ('pending', 1, None)
+    queue.claim('sync', 1)
+    queue.fail('sync', 'w1', 'timeout')
+    assert status(queue, 'sync', 'w1') == ('failed', 2, None)
+    assert queue.claim('sync', 1) == []
+
+
+def test_release_hands_jobs_back_without_counting_the_attempt(tmp_path):
+    a = make_queue(tmp_path, 'a')
+    b = make_queue(tmp_path, 'b')
+    a.enqueue('sniping', ['w1'])
+    a.claim('sniping', 1)
+    a.release('sniping', ['w1'])
+    assert status(a, 'sniping', 'w1') == ('pending', 0, None)
+    assert b.claim('sniping', 1) == ['w1']
+
+
+def test_expired_leases_are_claimed_again(tmp_path):
+    dead = make_queue(tmp_path, 'dead', lease_seconds=0.05, max_attempts=2)
+    alive = make_queue(tmp_path, 'alive', max_attempts=2)
+    dead.enqueue('pnl', ['w1'])
+    dead.claim('pnl', 1)
+    assert alive.claim('pnl', 1) == []
+    assert alive.unfinished(['pnl']) == 1
+    time.sleep(0.1)
+    assert alive.claim('pnl', 1) == ['w1']
+    # the worker that lost the lease can no longer checkpoint the job
+    assert not dead.complete('pnl', 'w1')
+    assert status(alive, 'pnl', 'w1') == ('leased', 2, 'alive')
+
+
+def test_jobs_whose_lease_expired_on_every_attempt_are_given_up(tmp_path):
+    queue = make_queue(tmp_path, 'a', lease_seconds=0.05, max_attempts=1)
+    queue.enqueue('pnl', ['w1'])
+    queue.claim('pnl', 1)
+    time.sleep(0.1)
+    assert queue.claim('pnl', 1) == []
+    assert status(queue, 'pnl', 'w1') == ('failed', 1, None)
+    assert queue.unfinished(['pnl']) == 0
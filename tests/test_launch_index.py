@@ -0,0 +1,30 @@
+import asyncio
+from utils.launch_index import NO_POOLS, LaunchTimeIndex
+
+
+def test_earliest_launch_time_wins(tmp_path):
+    index = LaunchTimeIndex(str(tmp_path / 'wallets.db'))
+    index.put_many([('mint', 500)])
+    # a later first pool from a partial pool list does not replace the known launch time
+    index.put_many([('mint', 900)])
+    assert index.get('mint') == 500
+    index.put('mint', 300)
+    assert index.get('mint') == 300
+
+
+def test_tokens_without_pools_are_not_stored(tmp_path):
+    index = LaunchTimeIndex(str(tmp_path / 'wallets.db'))
+    index.put_many([('prefilled', NO_POOLS)])
+    assert index.get('prefilled') is None
+
+    calls = []
+
+    async def fetch_token_info(mint):
+        calls.append(mint)
+        return {'pools': []} if len(calls) == 1 else {'pools': [{'createdAt': 42}, {'createdAt': 60}]}
+
+    assert asyncio.run(index.get_or_fetch('new', fetch_token_info)) is None
+    assert index.get('new') is None
+    # once the API reports a pool, the next lookup stores the launch time
+    assert asyncio.run(index.get_or_fetch('new', fetch_token_info)) == 42
+    assert index.get('new') == 42
@@ -0,0 +1,142 @@
+import asyncio
+import json
+from datetime import timedelta
+import httpx
+import pytest
+import fetch_and_analyze_wallets as analyzer
+from utils.http_client import RetryPolicy
+from utils.key_pool import KeyPool
+from utils.rpc_history import SOL_MINT, RpcClient, RpcError, parse_rpc_transaction
+from utils.transaction_store import TransactionStore
+
+WALLET = 'Wallet1111'
+MINT = 'Mint1111'
+FEE = 5000
+
+
+def rpc_transaction(signature, block_time, lamports, tokens, err=None, wallet=WALLET):
+    # jsonParsed getTransaction result where the wallet's SOL balance changes by lamports (before the fee)
+    # and its MINT token account by tokens
+    return {
+        'blockTime': block_time,
+        'transaction': {
+            'signatures': [signature],
+            'message': {'accountKeys': [{'pubkey': wallet}, {'pubkey': 'Pool1111'}]},
+        },
+        'meta': {
+            'err': err,
+            'fee': FEE,
+            'preBalances': [10_000_000_000, 0],
+            'postBalances': [10_000_000_000 + lamports - FEE, 0],
+            'preTokenBalances': [{'owner': wallet, 'mint': MINT, 'uiTokenAmount': {'uiAmount': 100}}],
+            'postTokenBalances': [{'owner': wallet, 'mint': MINT, 'uiTokenAmount': {'uiAmount': 100 + tokens}}],
+        },
+    }
+
+
+class StubRpc:
+    # local JSON-RPC node: getSignaturesForAddress and getTransaction over the stub's transactions (newest first)
+    def __init__(self):
+        self.transactions = []
+        self.failures = {}
+        self.fetched = []
+        self.reject_batches = False
+
+    def add(self, signature, block_time, lamports=-1_000_000_000, tokens=50):
+        self.transactions.insert(0, rpc_transaction(signature, block_time, lamports, tokens))
+
+    def call(self, method, params):
+        if method == 'getSignaturesForAddress':
+            options = params[1]
+            signatures = [{'signature': tx['transaction']['signatures'][0], 'blockTime': tx['blockTime']} for tx in self.transactions]
+            names = [info['signature'] for info in signatures]
+            if options.get('before'):
+                signatures = signatures[names.index(options['before']) + 1:]
+            if options.get('until') in names:
+                signatures = signatures[:[info['signature'] for info in signatures].index(options['until'])]
+            return {'result': signatures[:options['limit']]}
+        signature = params[0]
+        # a per-call error (e.g. a 429 of a single call) for the next failures[signature] requests
+        if self.failures.get(signature, 0) > 0:
+            self.failures[signature] -= 1
+            return {'error': {'code': 429, 'message': 'Too many requests'}}
+        self.fetched.append(signature)
+        return {'result': next(tx for tx in self.transactions if tx['transaction']['signatures'][0] == signature)}
+
+    def handler(self, request):
+        payload = json.loads(request.content)
+        if self.reject_batches:
+            return httpx.Response(200, json={'jsonrpc': '2.0', 'error': {'code': -32600, 'message': 'batch requests are disabled'}, 'id': None})
+        return httpx.Response(200, json=[{'jsonrpc': '2.0', 'id': call['id'], **self.call(call['method'], call['params'])} for call in payload])
+
+
+def sync(stub, store):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(stub.handler)) as client:
+            rpc = RpcClient(client, KeyPool(['http://rpc.local'], 1000), RetryPolicy(max_retries=2, backoff_base=0))
+            return await analyzer.sync_wallet_transactions_rpc(rpc, store, WALLET, timedelta(days=7))
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TransactionStore(str(tmp_path / 'wallets.db'))
+    yield store
+    store.close()
+
+
+def test_parse_buy_and_sell():
+    buy = parse_rpc_transaction(rpc_transaction('b', 1000, -2_000_000_000, 40), WALLET)
+    assert (buy.type, buy.token_in_address, buy.token_in_amount, buy.token_out_address, buy.token_out_amount) == ('buy', SOL_MINT, 2.0, MINT, 40)
+    sell = parse_rpc_transaction(rpc_transaction('s', 1000, 3_000_000_000, -40), WALLET)
+    assert (sell.type, sell.token_in_address, sell.token_in_amount, sell.token_out_address, sell.token_out_amount) == ('sell', MINT, 40, SOL_MINT, 3.0)
+
+
+def test_parse_failed_and_foreign_transactions_are_not_swaps():
+    assert parse_rpc_transaction(rpc_transaction('f', 1000, -2_000_000_000, 40, err={'InstructionError': []}), WALLET).type == 'N/A'
+    assert parse_rpc_transaction(rpc_transaction('o', 1000, -2_000_000_000, 40, wallet='Other1111'), WALLET).type == 'N/A'
+    # a SOL transfer without a token change
+    assert parse_rpc_transaction(rpc_transaction('t', 1000, -2_000_000_000, 0), WALLET).type == 'N/A'
+
+
+def test_sync_only_fetches_new_transactions(store):
+    stub = StubRpc()
+    for i in range(3):
+        stub.add(f'sig{i}', 1_700_000_000 + i * 60)
+    assert [tx.signature for tx in sync(stub, store)] == ['sig0', 'sig1', 'sig2']
+
+    stub.add('sig3', 1_700_000_300)
+    stub.fetched.clear()
+    assert [tx.signature for tx in sync(stub, store)] == ['sig0', 'sig1', 'sig2', 'sig3']
+    assert stub.fetched == ['sig3']
+
+
+def test_sync_retries_calls_that_failed_inside_a_batch(store):
+    stub = StubRpc()
+    for i in range(3):
+        stub.add(f'sig{i}', 1_700_000_000 + i * 60)
+    stub.failures['sig1'] = 1
+    assert [tx.signature for tx in sync(stub, store)] == ['sig0', 'sig1', 'sig2']
+
+
+def test_sync_fails_without_moving_the_sync_state_when_a_transaction_stays_missing(store):
+    stub = StubRpc()
+    for i in range(3):
+        stub.add(f'sig{i}', 1_700_000_000 + i * 60)
+    stub.failures['sig1'] = 10
+    with pytest.raises(RpcError):
+        sync(stub, store)
+    assert store.get_sync_state(WALLET) == (None, None)
+    assert store.load(WALLET) == []
+
+    # the next sync fetches the whole range again
+    stub.failures.clear()
+    assert [tx.signature for tx in sync(stub, store)] == ['sig0', 'sig1', 'sig2']
+
+
+def test_rejected_batch_raises_rpc_error(store):
+    stub = StubRpc()
+    stub.add('sig0', 1_700_000_000)
+    stub.reject_batches = True
+    with pytest.raises(RpcError, match='batch requests are disabled'):
+        sync(stub, store)
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+import httpx
+from utils.http_client import RETRY_STATUS_CODES, RequestBudget, RetryPolicy
+from utils.metrics import metrics as default_metrics
+from utils.pipeline import DONE
+
+
+class ProviderClient:
+    # Rate limited JSON client for a single API provider (Solana Tracker, Shyft, ...) backed by a pool of API keys
+    def __init__(self, client, key_pool, retry_policy=None, budget=None, metrics=None):
+        self.client = client
+        self.key_pool = key_pool
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.budget = budget or RequestBudget()
+        self.metrics = metrics or default_metrics
+
+    async def _send(self, url, params=None, stream=False):
+        # response of the last attempt, a streamed response is only open if it is returned
+        for attempt in range(self.retry_policy.max_retries + 1):
+            self.budget.spend()
+            start = time.monotonic()
+            key = await self.key_pool.acquire()
+            self.metrics.record_limiter_wait(url, time.monotonic() - start)
+
+            start = time.monotonic()
+            try:
+                request = self.client.build_request('GET', url, params=params, headers={'x-api-key': key.key})
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError:
+                self.metrics.record_request(url, time.monotonic() - start, 0, None)
+                if attempt == self.retry_policy.max_retries:
+                    raise
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+                continue
+
+            # a streamed body is not read yet, its size is what the server announced
+            size = int(response.headers.get('Content-Length', 0)) if stream else len(response.content)
+            self.metrics.record_request(url, time.monotonic() - start, size, response.status_code)
+            self.key_pool.report(key, response.status_code, response.headers.get('Retry-After'))
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.retry_policy.max_retries:
+                return response
+            if stream:
+                await response.aclose()
+            # a 429 benches the key and the next attempt waits for the key pool, other errors back off
+            if response.status_code != 429:
+                await asyncio.sleep(self.retry_policy.delay(attempt, response.headers.get('Retry-After')))
+
+    async def get_json(self, url, params=None):
+        response = await self._send(url, params)
+        response.raise_for_status()  # Raise an error for bad status codes
+        return response.json()
+
+    @asynccontextmanager
+    async def stream(self, url, params=None):
+        # same retries as get_json, but the body is left unread for incremental parsing
+        response = await self._send(url, params, stream=True)
+        try:
+            if response.is_error:
+                await response.aread()
+            response.raise_for_status()
+            yield response
+        finally:
+            await response.aclose()
+
+
+def create_http_client(max_connections):
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(30.0))
+
+
+async def run_bounded(items, worker, concurrency):
+    # run worker(item) for every item with `concurrency` workers pulling from the iterator,
+    # yielding (item, result, error) tuples in completion order. Items are only taken when a worker is free,
+    # so a long (or lazy) list of items does not turn into as many pending tasks
+    items = iter(items)
+    results = asyncio.Queue(maxsize=concurrency)
+
+    async def run():
+        try:
+            for item in items:
+                try:
+                    result = item, await worker(item), None
+                except Exception as e:
+                    result = item, None, e
+                await results.put(result)
+        except Exception:
+            # the items iterator failed, the error is raised once every worker stopped
+            await results.put(DONE)
+            raise
+        await results.put(DONE)
+
+    tasks = [asyncio.ensure_future(run()) for _ in range(concurrency)]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            result = await results.get()
+            if result is DONE:
+                remaining -= 1
+            else:
+                yield result
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,85 @@
+import operator
+from collections import Counter
+
+# numpy is imported by the functions that evaluate rules, so building a rule set at import time stays cheap
+OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+
+class Rule:
+    # column <op> threshold, a missing (NaN) value never passes
+    def __init__(self, name, column, op, threshold):
+        self.name = name
+        self.column = column
+        self.op = op
+        self.threshold = float(threshold)
+
+    def mask(self, values):
+        import numpy as np
+        with np.errstate(invalid='ignore'):
+            return OPERATORS[self.op](values, self.threshold)
+
+    def __repr__(self):
+        return f'Rule({self.name}: {self.column} {self.op} {self.threshold})'
+
+
+def profitability_rules(winrate_min, winrate_max, roi_min, invested_min):
+    return [
+        Rule('winrate_min', 'win_percentage', '>=', winrate_min),
+        Rule('winrate_max', 'win_percentage', '<=', winrate_max),
+        Rule('profitable', 'total', '>', 0),
+        Rule('invested_min', 'total_invested', '>', invested_min),
+        Rule('roi_min', 'roi', '>=', roi_min),
+    ]
+
+
+def to_array(values):
+    # float64, None becomes NaN
+    import numpy as np
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def summary_columns(summaries, win_rate=True):
+    # column arrays for a batch of PnL summaries (winPercentage, total, totalInvested), ROI in percent;
+    # without win_rate the win rate rules are skipped, e.g. for per-token top traders that do not report one
+    import numpy as np
+    total = to_array([summary.get('total') for summary in summaries])
+    total_invested = to_array([summary.get('totalInvested') for summary in summaries])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roi = np.where(total_invested > 0, total / total_invested * 100, np.nan)
+    columns = {'total': total, 'total_invested': total_invested, 'roi': roi}
+    if win_rate:
+        columns['win_percentage'] = to_array([summary.get('winPercentage') for summary in summaries])
+    return columns
+
+
+class WalletFilter:
+    # Declarative rule set evaluated as one boolean mask per rule over a whole batch of wallets,
+    # counting how many wallets each rule rejected. Rules on columns the batch does not have are skipped
+    def __init__(self, rules):
+        self.rules = rules
+        self.evaluated = 0
+        self.passed = 0
+        self.rejections = Counter()
+
+    def evaluate(self, columns):
+        # columns: dict (or DataFrame) of equally long arrays, returns the mask of wallets passing every rule
+        import numpy as np
+        keys = list(columns.keys())
+        size = len(columns[keys[0]]) if keys else 0
+        passed = np.ones(size, dtype=bool)
+        for rule in self.rules:
+            if rule.column not in columns:
+                continue
+            rule_mask = rule.mask(np.asarray(columns[rule.column], dtype=np.float64))
+            self.rejections[rule.name] += int(size - rule_mask.sum())
+            passed &= rule_mask
+        self.evaluated += size
+        self.passed += int(passed.sum())
+        return passed
+
+    def select(self, items, columns):
+        return [item for item, keep in zip(items, self.evaluate(columns)) if keep]
+
+    def report(self):
+        rejections = ', '.join(f'{rule.name}: {self.rejections[rule.name]}' for rule in self.rules)
+        return f'{self.passed}/{self.evaluated} passed, rejected by {rejections}'
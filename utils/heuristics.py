@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from utils.thresholds import DEFAULT_THRESHOLDS
+
+FRAME_COLUMNS = ['wallet', 'signature', 'block_time', 'type', 'token_in_address', 'token_in_amount', 'token_out_address', 'token_out_amount']
+
+
+def build_transaction_frame(wallet_transactions):
+    # one columnar frame with the swap records of every wallet
+    records = [(wallet, tx) for wallet, transactions in wallet_transactions.items() for tx in transactions]
+    frame = pd.DataFrame({
+        'wallet': [wallet for wallet, _ in records],
+        **{column: [getattr(tx, column) for _, tx in records] for column in FRAME_COLUMNS[1:]}
+    }, columns=FRAME_COLUMNS)
+    frame['block_time'] = frame['block_time'].astype(np.int64)
+    frame[['token_in_amount', 'token_out_amount']] = frame[['token_in_amount', 'token_out_amount']].astype(np.float64)
+
+    # the traded token and its amount, from the wallet's point of view
+    is_buy = frame['type'] == 'buy'
+    frame['token'] = np.where(is_buy, frame['token_out_address'], frame['token_in_address'])
+    frame['token_amount'] = np.where(is_buy, frame['token_out_amount'], frame['token_in_amount'])
+    return frame
+
+
+def first_buys(frame):
+    buys = frame[frame['type'] == 'buy']
+    return buys.groupby(['wallet', 'token'])['block_time'].min().rename('first_buy').reset_index()
+
+
+def compute_token_features(frame, launch_times, thresholds):
+    # per (wallet, token) aggregates: buys, sells, first buy, first sell after it, launch time
+    trades = frame[frame['type'].isin(['buy', 'sell'])]
+    buys = trades[trades['type'] == 'buy'].groupby(['wallet', 'token']).agg(
+        buy_count=('block_time', 'size'), first_buy=('block_time', 'min'), bought=('token_amount', 'sum'))
+    sells = trades[trades['type'] == 'sell'].groupby(['wallet', 'token']).agg(
+        sell_count=('block_time', 'size'), sold=('token_amount', 'sum'))
+
+    sells_after_buy = trades[trades['type'] == 'sell'].merge(buys['first_buy'].reset_index(), on=['wallet', 'token'])
+    sells_after_buy = sells_after_buy[sells_after_buy['block_time'] >= sells_after_buy['first_buy']]
+    first_sells = sells_after_buy.groupby(['wallet', 'token'])['block_time'].min().rename('first_sell')
+
+    tokens = buys.join(sells, how='outer').join(first_sells)
+    tokens[['buy_count', 'sell_count', 'bought', 'sold']] = tokens[['buy_count', 'sell_count', 'bought', 'sold']].fillna(0)
+    tokens['hold_seconds'] = tokens['first_sell'] - tokens['first_buy']
+    tokens['is_scalp'] = tokens['hold_seconds'] < thresholds['scalp_window_seconds']
+    tokens['is_oversold'] = (tokens['bought'] > 0) & (tokens['sold'] > tokens['bought'])
+
+    # launch times are in ms, block times in seconds
+    launch_time = tokens.index.get_level_values('token').map(launch_times).astype(float) / 1000
+    tokens['is_sniped'] = (np.abs(tokens['first_buy'] - launch_time) <= thresholds['sniping_window_seconds']).to_numpy()
+    return tokens
+
+
+def compute_features(frame, launch_times, thresholds=DEFAULT_THRESHOLDS, wallets=None):
+    # per-wallet feature table computed in one vectorized pass over all wallets
+    tokens = compute_token_features(frame, launch_times, thresholds)
+    by_wallet = tokens.groupby(level='wallet')
+    features = pd.DataFrame({
+        'tokens_traded': by_wallet.size(),
+        'max_buys_per_token': by_wallet['buy_count'].max(),
+        'multi_buy_tokens': (tokens['buy_count'] > 1).groupby(level='wallet').sum(),
+        'avg_hold_minutes': by_wallet['hold_seconds'].mean() / 60,
+        'scalp_ratio': by_wallet['is_scalp'].sum() / by_wallet['hold_seconds'].count().replace(0, np.nan),
+        'oversold_tokens': by_wallet['is_oversold'].sum(),
+        'sniped_tokens': by_wallet['is_sniped'].sum(),
+    })
+
+    is_trade = frame['type'].isin(['buy', 'sell'])
+    span = frame.groupby('wallet')['block_time'].agg(['min', 'max'])
+    features['active_days'] = ((span['max'] - span['min']) / 86400).clip(lower=1)
+    features['trade_count'] = frame[is_trade].groupby('wallet').size()
+    features['non_swap_count'] = frame[~is_trade].groupby('wallet').size()
+
+    if wallets is not None:
+        features = features.reindex(pd.Index(wallets, name='wallet'))
+    count_columns = ['tokens_traded', 'max_buys_per_token', 'multi_buy_tokens', 'oversold_tokens', 'sniped_tokens', 'trade_count', 'non_swap_count']
+    features[count_columns] = features[count_columns].fillna(0).astype(int)
+    features['active_days'] = features['active_days'].fillna(1)
+    features['trades_per_day'] = features['trade_count'] / features['active_days']
+    features['non_swaps_per_day'] = features['non_swap_count'] / features['active_days']
+    return features
+
+
+def apply_heuristics(features, thresholds=DEFAULT_THRESHOLDS):
+    # boolean verdict columns; missing values (e.g. no sells yet) never reject a wallet
+    verdicts = pd.DataFrame(index=features.index)
+    verdicts['is_sniping'] = features['sniped_tokens'] > 0
+    verdicts['is_scalper'] = features['scalp_ratio'].fillna(0) > thresholds['max_scalp_ratio']
+    verdicts['short_holds'] = features['avg_hold_minutes'].fillna(np.inf) < thresholds['min_avg_hold_minutes']
+    verdicts['multiple_buys'] = features['max_buys_per_token'] > thresholds['max_buys_per_token']
+    verdicts['sells_more_than_buys'] = features['oversold_tokens'] > 0
+    verdicts['trade_frequency'] = ~features['trades_per_day'].between(thresholds['min_trades_per_day'], thresholds['max_trades_per_day'])
+    verdicts['frequent_airdrops'] = features['non_swaps_per_day'] > thresholds['max_non_swaps_per_day']
+    verdicts['passes'] = ~verdicts.any(axis=1)
+    return verdicts
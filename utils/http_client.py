@@ -0,0 +1,32 @@
+import random
+from utils.key_pool import parse_retry_after
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RequestBudgetExceeded(Exception):
+    pass
+
+
+class RequestBudget:
+    # Caps the number of requests a run is allowed to make (0 means unlimited)
+    def __init__(self, max_requests=0):
+        self.max_requests = max_requests
+        self.used = 0
+
+    def spend(self):
+        if self.max_requests and self.used >= self.max_requests:
+            raise RequestBudgetExceeded(f'Request budget of {self.max_requests} requests exhausted')
+        self.used += 1
+
+
+class RetryPolicy:
+    # Bounded exponential backoff with jitter, a Retry-After header always wins
+    def __init__(self, max_retries=5, backoff_base=0.5, backoff_max=30.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def delay(self, attempt, retry_after=None):
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+        return min(self.backoff_max, parse_retry_after(retry_after, backoff))
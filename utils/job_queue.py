@@ -0,0 +1,131 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+
+# job states, a leased job whose lease expired is claimable again
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class JobQueue:
+    # Durable per-wallet work items (one job per kind and wallet) shared by any number of worker processes
+    # through the database file. A worker claims jobs with a lease, extends it while it works and completes
+    # or fails them; jobs of a worker that died become claimable again once their lease expires.
+    # Claims run in an immediate transaction, so two workers never get the same job
+    def __init__(self, path, lease_seconds=300, max_attempts=3, worker_id=None, timeout=30):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or default_worker_id()
+        # isolation_level=None: transactions are opened explicitly, every other statement commits on its own
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs (kind TEXT NOT NULL, wallet TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+            'lease_owner TEXT, lease_expires REAL, enqueued_at REAL NOT NULL, updated_at REAL NOT NULL, result TEXT, error TEXT, PRIMARY KEY (kind, wallet))'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (kind, status, lease_expires)')
+
+    def enqueue(self, kind, wallets, requeue=False):
+        # returns the number of jobs added, a wallet already queued for this kind keeps its job unless requeue
+        # is set, which resets finished and failed jobs (a wallet that is being worked on is left alone)
+        now = time.time()
+        conflict = (
+            "DO UPDATE SET status = 'pending', attempts = 0, lease_owner = NULL, lease_expires = NULL, enqueued_at = excluded.enqueued_at, "
+            "updated_at = excluded.updated_at, result = NULL, error = NULL WHERE jobs.status IN ('done', 'failed')"
+        ) if requeue else 'DO NOTHING'
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = self.conn.executemany(
+                f'INSERT INTO jobs (kind, wallet, status, enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?) ON CONFLICT (kind, wallet) {conflict}',
+                [(kind, wallet, PENDING, now, now) for wallet in wallets]
+            )
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount
+
+    def claim(self, kind, limit):
+        # lease up to limit pending (or expired) jobs of one kind, oldest first
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            # a job whose worker died on every attempt (e.g. it keeps running out of memory) is given up
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?, error = 'lease expired' WHERE kind = ? AND status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, now, kind, LEASED, now, self.max_attempts)
+            )
+            wallets = [row[0] for row in self.conn.execute(
+                'SELECT wallet FROM jobs WHERE kind = ? AND (status = ? OR (status = ? AND lease_expires < ?)) ORDER BY enqueued_at, wallet LIMIT ?',
+                (kind, PENDING, LEASED, now, limit)
+            )]
+            self.conn.executemany(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated_at = ? WHERE kind = ? AND wallet = ?',
+                [(LEASED, self.worker_id, now + self.lease_seconds, now, kind, wallet) for wallet in wallets]
+            )
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return wallets
+
+    def extend(self, kind, wallets):
+        # heartbeat for jobs that are still being worked on, returns the wallets whose lease this worker still holds
+        now = time.time()
+        held = []
+        for wallet in wallets:
+            cursor = self.conn.execute(
+                'UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE kind = ? AND wallet = ? AND status = ? AND lease_owner = ?',
+                (now + self.lease_seconds, now, kind, wallet, LEASED, self.worker_id)
+            )
+            if cursor.rowcount:
+                held.append(wallet)
+        return held
+
+    def complete(self, kind, wallet, result=None):
+        # checkpoint a finished job, False if the lease was lost to another worker in the meantime
+        cursor = self.conn.execute(
+            'UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?, result = ?, error = NULL WHERE kind = ? AND wallet = ? AND lease_owner = ?',
+            (DONE, time.time(), json.dumps(result), kind, wallet, self.worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, kind, wallet, error):
+        # the job is retried by the next claim until it failed max_attempts times
+        cursor = self.conn.execute(
+            'UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, lease_owner = NULL, lease_expires = NULL, updated_at = ?, error = ? '
+            'WHERE kind = ? AND wallet = ? AND lease_owner = ?',
+            (self.max_attempts, FAILED, PENDING, time.time(), str(error), kind, wallet, self.worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def release(self, kind, wallets):
+        # hand unfinished jobs back without counting the attempt, e.g. on shutdown
+        self.conn.executemany(
+            'UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE kind = ? AND wallet = ? AND lease_owner = ?',
+            [(PENDING, time.time(), kind, wallet, self.worker_id) for wallet in wallets]
+        )
+
+    def unfinished(self, kinds):
+        # pending and leased jobs of these kinds, including leases of workers that may have died
+        placeholders = ', '.join(['?'] * len(kinds))
+        row = self.conn.execute(f'SELECT COUNT(*) FROM jobs WHERE kind IN ({placeholders}) AND status IN (?, ?)', (*kinds, PENDING, LEASED)).fetchone()
+        return row[0]
+
+    def counts(self, kind=None):
+        # {kind: {status: count}}
+        counts = {}
+        query = 'SELECT kind, status, COUNT(*) FROM jobs' + (' WHERE kind = ?' if kind else '') + ' GROUP BY kind, status'
+        for job_kind, status, count in self.conn.execute(query, (kind,) if kind else ()):
+            counts.setdefault(job_kind, {})[status] = count
+        return counts
+
+    def close(self):
+        self.conn.close()
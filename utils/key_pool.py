@@ -0,0 +1,63 @@
+import asyncio
+import time
+from utils.rate_limiter import TokenBucket
+
+
+def parse_retry_after(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class PooledKey:
+    def __init__(self, key, rate_limit):
+        self.key = key
+        self.limiter = TokenBucket(rate_limit)
+        self.cooldown_until = 0.0
+        self.waiting = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def wait_time(self, now):
+        # how long a new request would wait on this key, counting the requests already queued on it
+        return max(self.cooldown_until - now, (self.waiting + 1 - self.limiter.available()) / self.limiter.rate)
+
+    def masked(self):
+        return f'{self.key[:4]}...{self.key[-4:]}' if len(self.key) > 8 else '****'
+
+
+class KeyPool:
+    # Spreads requests over several API keys, each with its own rate limit, and benches keys that return 429
+    def __init__(self, api_keys, rate_limit_per_key, cooldown=10):
+        self.keys = [PooledKey(key, rate_limit_per_key) for key in api_keys]
+        self.cooldown = cooldown
+
+    def _soonest_key(self):
+        if not self.keys:
+            raise ValueError('No API keys configured')
+        now = time.monotonic()
+        return min(self.keys, key=lambda key: key.wait_time(now)), now
+
+    async def acquire(self):
+        key, now = self._soonest_key()
+        key.waiting += 1
+        try:
+            if key.cooldown_until > now:
+                await asyncio.sleep(key.cooldown_until - now)
+            await key.limiter.acquire()
+        finally:
+            key.waiting -= 1
+        key.requests += 1
+        return key
+
+    def report(self, key, status_code, retry_after=None):
+        if status_code == 429:
+            key.rate_limited += 1
+            key.cooldown_until = time.monotonic() + parse_retry_after(retry_after, self.cooldown)
+        elif status_code >= 400:
+            key.errors += 1
+
+    def usage(self):
+        return [{'key': key.masked(), 'requests': key.requests, 'rate_limited': key.rate_limited, 'errors': key.errors} for key in self.keys]
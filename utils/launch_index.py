@@ -0,0 +1,73 @@
+import asyncio
+import sqlite3
+from utils.async_engine import run_bounded
+
+
+# launch time of a token without (dated) pools, never stored so the token is looked up again later
+NO_POOLS = 9999999999999
+
+
+def launch_time_from_token_info(token_info):
+    # launch time in ms is the creation time of the token's first pool
+    return min([item.get('createdAt', NO_POOLS) for item in token_info.get('pools', [])] or [NO_POOLS])
+
+
+class LaunchTimeIndex:
+    # Persistent mint -> launch time (ms) index, shared across wallets and runs
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS token_launch_times (mint TEXT PRIMARY KEY, created_at INTEGER NOT NULL)')
+        self.conn.commit()
+        self._pending = {}
+
+    def get(self, mint):
+        row = self.conn.execute('SELECT created_at FROM token_launch_times WHERE mint = ?', (mint,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, mints):
+        return {mint: created_at for mint in mints if (created_at := self.get(mint)) is not None}
+
+    def put_many(self, launch_times):
+        # a partial pool list (e.g. of a trending token) can only report a later first pool, the earliest time wins
+        self.conn.executemany(
+            'INSERT INTO token_launch_times (mint, created_at) VALUES (?, ?) '
+            'ON CONFLICT (mint) DO UPDATE SET created_at = MIN(created_at, excluded.created_at)',
+            [(mint, created_at) for mint, created_at in launch_times if created_at != NO_POOLS]
+        )
+        self.conn.commit()
+
+    def put(self, mint, created_at):
+        self.put_many([(mint, created_at)])
+
+    def missing(self, mints):
+        return [mint for mint in set(mints) if self.get(mint) is None]
+
+    async def _fetch_and_store(self, mint, fetch_token_info):
+        # None while the API reports no pools for the token, that counts as a miss rather than a launch time
+        created_at = launch_time_from_token_info(await fetch_token_info(mint))
+        if created_at == NO_POOLS:
+            return None
+        self.put(mint, created_at)
+        return created_at
+
+    async def get_or_fetch(self, mint, fetch_token_info):
+        created_at = self.get(mint)
+        if created_at is not None:
+            return created_at
+
+        # concurrent lookups of the same mint share a single API call
+        if mint not in self._pending:
+            self._pending[mint] = asyncio.ensure_future(self._fetch_and_store(mint, fetch_token_info))
+            self._pending[mint].add_done_callback(lambda _: self._pending.pop(mint, None))
+        return await self._pending[mint]
+
+    async def warm(self, mints, fetch_token_info, concurrency):
+        # fill the index for all unknown mints up front, returns the mints that failed
+        failed = []
+        async for mint, _, error in run_bounded(self.missing(mints), lambda mint: self.get_or_fetch(mint, fetch_token_info), concurrency):
+            if error:
+                failed.append(mint)
+        return failed
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import logging
+import websockets
+from utils.http_client import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class LogWatcher:
+    # Solana logsSubscribe for many wallets over a few websocket connections (one subscription per wallet,
+    # the mentions filter only takes a single address). on_activity(wallet, signature) is called for every
+    # successful transaction that mentions a wallet, and on_reconnect(wallets) after a dropped connection
+    # is re-established, since notifications sent in between are lost
+    def __init__(self, ws_url, wallets, on_activity, on_reconnect=None, subscriptions_per_connection=100, retry_policy=None, commitment='confirmed'):
+        self.ws_url = ws_url
+        self.wallets = list(wallets)
+        self.on_activity = on_activity
+        self.on_reconnect = on_reconnect
+        self.subscriptions_per_connection = subscriptions_per_connection
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.commitment = commitment
+
+    async def run(self):
+        chunks = [self.wallets[i:i + self.subscriptions_per_connection] for i in range(0, len(self.wallets), self.subscriptions_per_connection)]
+        await asyncio.gather(*[self._watch(chunk) for chunk in chunks])
+
+    async def _watch(self, wallets):
+        # reconnect forever, backing off while the node is unreachable
+        attempt = 0
+        connected_before = False
+        while True:
+            try:
+                async with websockets.connect(self.ws_url, ping_interval=20, max_size=None) as ws:
+                    requests = {}
+                    for i, wallet in enumerate(wallets):
+                        requests[i] = wallet
+                        await ws.send(json.dumps({'jsonrpc': '2.0', 'id': i, 'method': 'logsSubscribe', 'params': [{'mentions': [wallet]}, {'commitment': self.commitment}]}))
+                    if connected_before and self.on_reconnect:
+                        await self.on_reconnect(wallets)
+                    connected_before = True
+                    attempt = 0
+
+                    subscriptions = {}
+                    async for message in ws:
+                        data = json.loads(message)
+                        if data.get('id') in requests:
+                            wallet = requests.pop(data['id'])
+                            if 'error' in data:
+                                logger.error(f"logsSubscribe failed for {wallet}: {data['error']}")
+                            else:
+                                subscriptions[data['result']] = wallet
+                        elif data.get('method') == 'logsNotification':
+                            wallet = subscriptions.get(data['params']['subscription'])
+                            value = data['params']['result']['value']
+                            if wallet and value.get('err') is None:
+                                await self.on_activity(wallet, value['signature'])
+            except (OSError, websockets.WebSocketException) as e:
+                logger.warning(f"Websocket connection lost: {e}")
+            else:
+                logger.warning("Websocket connection closed by the node")
+            delay = self.retry_policy.delay(attempt)
+            attempt += 1
+            logger.info(f"Reconnecting in {delay:.1f}s")
+            await asyncio.sleep(delay)
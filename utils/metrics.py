@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# url path -> endpoint label, most specific first
+ENDPOINT_LABELS = [
+    ('/top-traders/all/', 'top-traders'),
+    ('/top-traders/', 'token-top-traders'),
+    ('/tokens/trending/', 'trending'),
+    ('/tokens/', 'tokens'),
+    ('/trades/', 'trades'),
+    ('/pnl/', 'pnl'),
+    ('/wallet/', 'wallet'),
+    ('/transaction/history', 'shyft-history'),
+    # RPC requests are recorded under their JSON-RPC method
+    ('getSignaturesForAddress', 'rpc-signatures'),
+    ('getTransaction', 'rpc-transactions'),
+]
+
+
+def endpoint_label(url):
+    for path, label in ENDPOINT_LABELS:
+        if path in url:
+            return label
+    return 'other'
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        # (le, count) pairs as Prometheus expects them
+        total = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            total += count
+            yield str(bucket), total
+        yield '+Inf', self.count
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': round(self.sum, 6), 'avg': round(self.sum / self.count, 6) if self.count else None, 'buckets': dict(self.cumulative())}
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.limiter_wait_seconds = 0.0
+        self.latency = Histogram()
+
+    def to_dict(self):
+        return {
+            'requests': self.requests, 'bytes': self.bytes, 'errors': self.errors, 'rate_limited': self.rate_limited,
+            'limiter_wait_seconds': round(self.limiter_wait_seconds, 6), 'latency_seconds': self.latency.to_dict()
+        }
+
+
+class Metrics:
+    # Per endpoint request metrics and per stage timings for one run
+    def __init__(self):
+        self.started_at = time.time()
+        self.endpoints = {}
+        self.stages = {}
+
+    def endpoint(self, url):
+        label = endpoint_label(url)
+        if label not in self.endpoints:
+            self.endpoints[label] = EndpointMetrics()
+        return self.endpoints[label]
+
+    def record_request(self, url, latency, size, status_code):
+        endpoint = self.endpoint(url)
+        endpoint.requests += 1
+        endpoint.bytes += size
+        endpoint.latency.observe(latency)
+        if status_code == 429:
+            endpoint.rate_limited += 1
+        elif status_code is None or status_code >= 400:
+            endpoint.errors += 1
+
+    def record_limiter_wait(self, url, seconds):
+        self.endpoint(url).limiter_wait_seconds += seconds
+
+    def record_stage(self, name, seconds):
+        if name not in self.stages:
+            self.stages[name] = Histogram()
+        self.stages[name].observe(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.monotonic() - start)
+
+    def summary(self):
+        elapsed = time.time() - self.started_at
+        total_requests = sum(endpoint.requests for endpoint in self.endpoints.values())
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'requests': total_requests,
+            'requests_per_second': round(total_requests / elapsed, 3) if elapsed else None,
+            'endpoints': {label: endpoint.to_dict() for label, endpoint in sorted(self.endpoints.items())},
+            'stages': {name: histogram.to_dict() for name, histogram in sorted(self.stages.items())},
+        }
+
+    def prometheus(self, labels=None):
+        # labels: constant labels added to every sample, e.g. the worker that wrote the file
+        lines = []
+        constant = ''.join(f'{name}="{value}",' for name, value in (labels or {}).items())
+
+        def counter(name, help, label, samples):
+            lines.append(f'# HELP wallet_analyzer_{name} {help}')
+            lines.append(f'# TYPE wallet_analyzer_{name} counter')
+            for label_value, value in samples:
+                lines.append(f'wallet_analyzer_{name}{{{constant}{label}="{label_value}"}} {value}')
+
+        def histogram(name, help, label, histograms):
+            lines.append(f'# HELP wallet_analyzer_{name} {help}')
+            lines.append(f'# TYPE wallet_analyzer_{name} histogram')
+            for label_value, h in sorted(histograms.items()):
+                for le, count in h.cumulative():
+                    lines.append(f'wallet_analyzer_{name}_bucket{{{constant}{label}="{label_value}",le="{le}"}} {count}')
+                lines.append(f'wallet_analyzer_{name}_sum{{{constant}{label}="{label_value}"}} {h.sum}')
+                lines.append(f'wallet_analyzer_{name}_count{{{constant}{label}="{label_value}"}} {h.count}')
+
+        endpoints = sorted(self.endpoints.items())
+        counter('requests_total', 'Outbound API requests', 'endpoint', [(label, e.requests) for label, e in endpoints])
+        counter('response_bytes_total', 'Response body bytes received', 'endpoint', [(label, e.bytes) for label, e in endpoints])
+        counter('request_errors_total', 'Failed requests (other than 429)', 'endpoint', [(label, e.errors) for label, e in endpoints])
+        counter('rate_limited_total', 'Requests answered with 429', 'endpoint', [(label, e.rate_limited) for label, e in endpoints])
+        counter('limiter_wait_seconds_total', 'Time spent waiting on the rate limiter', 'endpoint', [(label, e.limiter_wait_seconds) for label, e in endpoints])
+        histogram('request_duration_seconds', 'Request latency', 'endpoint', {label: e.latency for label, e in endpoints})
+        histogram('stage_duration_seconds', 'Time spent per pipeline stage item', 'stage', self.stages)
+        return '\n'.join(lines) + '\n'
+
+    def write(self, json_file=None, prometheus_file=None, labels=None):
+        # write to a temp file first so readers (e.g. node_exporter) never see a partial file
+        for path, content in [(json_file, lambda: json.dumps(self.summary(), indent=2)), (prometheus_file, lambda: self.prometheus(labels))]:
+            if path:
+                replace_file(path, content())
+
+    async def export_periodically(self, json_file, prometheus_file, interval, labels=None):
+        while True:
+            await asyncio.sleep(interval)
+            self.write(json_file, prometheus_file, labels)
+
+
+def replace_file(path, content):
+    # atomic rewrite through a temp file of its own in the same directory, so several processes
+    # rewriting the same file never move each other's temp file away
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=f'{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# default registry shared by the clients of a run
+metrics = Metrics()
@@ -1,29 +1,54 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+from openpyxl import load_workbook
 
-def copy_rows(input_file, output_file):
-    # Read the Excel file
-    xls = pd.ExcelFile(input_file)
-    df_output = pd.DataFrame()
-    #add header row to df_output
-    predefined_columns = ['Wallet', 'ROI Realized', 'PnL Realized', 'WinRate', 'Total Fees', 'SOL Price', 'Balance', 'Not Swap Tx', 'Scam', 'Tokens']
-    
-    df_output = pd.DataFrame(columns=predefined_columns)
+PREDEFINED_COLUMNS = ['Wallet', 'ROI Realized', 'PnL Realized', 'WinRate', 'Total Fees', 'SOL Price', 'Balance', 'Not Swap Tx', 'Scam', 'Tokens']
+# the summary is the second row under the header, i.e. row 3 of every sheet
+SUMMARY_ROW = 3
 
-    for sheet_name in xls.sheet_names:
-        # Read the sheet into a DataFrame
-        df = pd.read_excel(xls, sheet_name=sheet_name)
-        
-        # Copy only the third row but just the first 5 columns
-        df_third_row = df.iloc[1:2, :10]
-        df_third_row.columns = predefined_columns
-        
-        # add the row to the output DataFrame under the columns defined in the header
-        df_output = pd.concat([df_output, df_third_row], ignore_index=True)
+def read_summary_rows(input_file):
+    # read-only mode streams each sheet, so only the rows up to the summary row are ever parsed
+    workbook = load_workbook(input_file, read_only=True, data_only=True)
+    rows = []
+    try:
+        for sheet in workbook.worksheets:
+            for row in sheet.iter_rows(min_row=SUMMARY_ROW, max_row=SUMMARY_ROW, max_col=len(PREDEFINED_COLUMNS), values_only=True):
+                # sheets without a summary row are skipped
+                if any(value is not None for value in row):
+                    rows.append(list(row) + [None] * (len(PREDEFINED_COLUMNS) - len(row)))
+    finally:
+        workbook.close()
+    return rows
 
-    # Save the output DataFrame to a csv file
-    df_output.to_excel(output_file, index=False)
+def write_frame(df_output, output_file):
+    # the format follows the extension: .csv, .parquet (needs pyarrow) or Excel
+    if output_file.endswith('.csv'):
+        df_output.to_csv(output_file, index=False)
+    elif output_file.endswith('.parquet'):
+        df_output.to_parquet(output_file, index=False)
+    else:
+        df_output.to_excel(output_file, index=False)
+
+def copy_rows(input_files, output_file, workers=1):
+    # copy the summary row of every sheet of one or more workbooks into a single table
+    if isinstance(input_files, str):
+        input_files = [input_files]
+
+    if workers > 1 and len(input_files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(read_summary_rows, input_files))
+    else:
+        results = [read_summary_rows(input_file) for input_file in input_files]
+
+    # build the frame once from all rows instead of concatenating per sheet
+    df_output = pd.DataFrame([row for rows in results for row in rows], columns=PREDEFINED_COLUMNS)
+    write_frame(df_output, output_file)
+    return df_output
 
 if __name__ == "__main__":
-    input_file = 'input.xlsx'  # Replace with your input file path
-    output_file = 'output.xlsx'  # Replace with your desired output file path
-    copy_rows(input_file, output_file)
\ No newline at end of file
+    # python utils/parser.py [input.xlsx ...] [output.xlsx|.csv|.parquet], a single argument is the input file
+    args = sys.argv[1:]
+    input_files = (args[:-1] if len(args) > 1 else args) or ['input.xlsx']  # Replace with your input file path
+    output_file = args[-1] if len(args) > 1 else 'output.xlsx'  # Replace with your desired output file path
+    copy_rows(input_files, output_file, workers=min(len(input_files), 4))
@@ -0,0 +1,81 @@
+import asyncio
+
+# end of stream marker passed through the queues
+DONE = object()
+
+
+async def feed(source, out_queue):
+    # put every item of an async iterable on the queue, blocking while the queue is full
+    try:
+        async for item in source:
+            await out_queue.put(item)
+    finally:
+        await out_queue.put(DONE)
+
+
+async def run_workers(in_queue, worker, concurrency, out_queue=None):
+    # consume the queue with `concurrency` workers, results that are not None flow to out_queue
+    async def run():
+        while True:
+            item = await in_queue.get()
+            if item is DONE:
+                # put the marker back so the other workers stop too
+                await in_queue.put(DONE)
+                return
+            result = await worker(item)
+            if result is not None and out_queue is not None:
+                await out_queue.put(result)
+
+    await asyncio.gather(*[run() for _ in range(concurrency)])
+    if out_queue is not None:
+        await out_queue.put(DONE)
+
+
+async def iterate_batches(queue, batch_size, max_wait):
+    # yield lists of up to batch_size items, a partial batch is flushed after max_wait seconds
+    loop = asyncio.get_running_loop()
+    done = False
+    while not done:
+        item = await queue.get()
+        if item is DONE:
+            return
+        batch = [item]
+        deadline = loop.time() + max_wait
+        while len(batch) < batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is DONE:
+                done = True
+                break
+            batch.append(item)
+        yield batch
+
+
+async def merge(*sources):
+    # interleave several async iterables into one stream, items come out as soon as any source produces them
+    queue = asyncio.Queue(maxsize=len(sources))
+
+    async def drain(source):
+        try:
+            async for item in source:
+                await queue.put(item)
+        finally:
+            await queue.put(DONE)
+
+    tasks = [asyncio.ensure_future(drain(source)) for source in sources]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item is DONE:
+                remaining -= 1
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
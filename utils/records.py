@@ -0,0 +1,48 @@
+import math
+import sys
+from datetime import datetime, timezone
+
+SWAP_RECORD_FIELDS = ('signature', 'block_time', 'type', 'token_in_name', 'token_in_address', 'token_in_amount', 'token_out_name', 'token_out_address', 'token_out_amount')
+
+
+def to_amount(value):
+    # float64 amount, NaN when missing or unparsable
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def intern_address(address):
+    # the same few mints show up in thousands of records, keep a single copy of each
+    return sys.intern(address) if address else None
+
+
+class SwapRecord:
+    # Compact parsed transaction: int epoch seconds, float amounts (NaN if missing) and interned addresses
+    __slots__ = SWAP_RECORD_FIELDS
+
+    def __init__(self, signature, block_time, type, token_in_name, token_in_address, token_in_amount, token_out_name, token_out_address, token_out_amount):
+        self.signature = signature
+        self.block_time = int(block_time) if block_time is not None else 0
+        self.type = type
+        self.token_in_name = token_in_name
+        self.token_in_address = intern_address(token_in_address)
+        self.token_in_amount = to_amount(token_in_amount)
+        self.token_out_name = token_out_name
+        self.token_out_address = intern_address(token_out_address)
+        self.token_out_amount = to_amount(token_out_amount)
+
+    @property
+    def blocktime_utc(self):
+        # human readable time, only meant for output
+        return datetime.fromtimestamp(self.block_time, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S') if self.block_time else 'N/A'
+
+    def to_tuple(self):
+        return tuple(getattr(self, field) for field in SWAP_RECORD_FIELDS)
+
+    def to_dict(self):
+        return dict(zip(SWAP_RECORD_FIELDS, self.to_tuple()), blocktime_utc=self.blocktime_utc)
+
+    def __repr__(self):
+        return f'SwapRecord({self.type} {self.signature} at {self.blocktime_utc})'
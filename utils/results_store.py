@@ -0,0 +1,114 @@
+import sqlite3
+import time
+from datetime import datetime, timezone
+from utils.metrics import replace_file
+
+# every column a stage can write, a stage only updates the columns it computed
+RESULT_COLUMNS = {
+    'run_id': 'TEXT',
+    'updated_at': 'REAL',
+    'discovered_at': 'REAL',
+    # PnL stage
+    'win_percentage': 'REAL',
+    'total': 'REAL',
+    'total_invested': 'REAL',
+    'roi': 'REAL',
+    'pnl_source': 'TEXT',
+    'profitable_and_winning': 'INTEGER',
+    'pnl_checked_at': 'REAL',
+    # sniping stage features
+    'tokens_traded': 'INTEGER',
+    'max_buys_per_token': 'INTEGER',
+    'multi_buy_tokens': 'INTEGER',
+    'avg_hold_minutes': 'REAL',
+    'scalp_ratio': 'REAL',
+    'oversold_tokens': 'INTEGER',
+    'sniped_tokens': 'INTEGER',
+    'active_days': 'REAL',
+    'trade_count': 'INTEGER',
+    'non_swap_count': 'INTEGER',
+    'trades_per_day': 'REAL',
+    'non_swaps_per_day': 'REAL',
+    # sniping stage verdicts
+    'is_sniping': 'INTEGER',
+    'is_scalper': 'INTEGER',
+    'short_holds': 'INTEGER',
+    'multiple_buys': 'INTEGER',
+    'sells_more_than_buys': 'INTEGER',
+    'trade_frequency': 'INTEGER',
+    'frequent_airdrops': 'INTEGER',
+    'passes': 'INTEGER',
+    'sniping_checked_at': 'REAL',
+}
+
+
+def to_sql_value(value):
+    # numpy scalars and NaN as plain python values / NULL
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+class ResultsStore:
+    # Latest per-wallet results of every stage, merged into one row per wallet (upsert), tagged with the run
+    # that last wrote them. The txt wallet lists and Parquet/CSV exports are derived from it
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, started_at REAL NOT NULL, finished_at REAL)')
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS wallet_results (wallet TEXT PRIMARY KEY, {", ".join(f"{name} {type}" for name, type in RESULT_COLUMNS.items())})')
+        self.conn.commit()
+        self.run_id = None
+
+    def start_run(self):
+        self.run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S.%fZ')
+        self.conn.execute('INSERT INTO runs (run_id, started_at) VALUES (?, ?)', (self.run_id, time.time()))
+        self.conn.commit()
+        return self.run_id
+
+    def finish_run(self):
+        self.conn.execute('UPDATE runs SET finished_at = ? WHERE run_id = ?', (time.time(), self.run_id))
+        self.conn.commit()
+
+    def upsert(self, records):
+        # records are dicts with a wallet and any of RESULT_COLUMNS, columns missing from a record keep their value
+        now = time.time()
+        groups = {}
+        for record in records:
+            columns = tuple(name for name in record if name != 'wallet')
+            groups.setdefault(columns, []).append(record)
+        for columns, group in groups.items():
+            names = ('wallet', 'run_id', 'updated_at') + columns
+            updates = ', '.join(f'{name} = excluded.{name}' for name in names[1:])
+            self.conn.executemany(
+                f'INSERT INTO wallet_results ({", ".join(names)}) VALUES ({", ".join(["?"] * len(names))}) ON CONFLICT (wallet) DO UPDATE SET {updates}',
+                [(record['wallet'], self.run_id, now) + tuple(to_sql_value(record[name]) for name in columns) for record in group]
+            )
+        self.conn.commit()
+
+    def upsert_frame(self, frame, **columns):
+        # one record per row of a frame indexed by wallet, plus constant columns (e.g. a timestamp)
+        records = [dict(row, wallet=wallet, **columns) for wallet, row in zip(frame.index, frame.to_dict('records'))]
+        self.upsert(records)
+
+    def query(self, where=None, params=()):
+        # pandas is only loaded for frame queries and exports
+        import pandas as pd
+        return pd.read_sql_query(f'SELECT * FROM wallet_results{f" WHERE {where}" if where else ""}', self.conn, params=params, index_col='wallet')
+
+    def wallets(self, where=None):
+        return [row[0] for row in self.conn.execute(f'SELECT wallet FROM wallet_results{f" WHERE {where}" if where else ""} ORDER BY wallet')]
+
+    def export_wallets(self, output_file, where=None):
+        # rewrite a wallet list in one go, through a temp file so readers never see a partial list
+        replace_file(output_file, ''.join(f'{wallet}\n' for wallet in self.wallets(where)))
+
+    def export(self, output_file):
+        # Parquet (needs pyarrow) or CSV, picked by the file extension
+        frame = self.query()
+        if output_file.endswith('.parquet'):
+            frame.to_parquet(output_file)
+        else:
+            frame.to_csv(output_file)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,143 @@
+import asyncio
+import time
+import httpx
+from utils.async_engine import run_bounded
+from utils.http_client import RETRY_STATUS_CODES, RequestBudget, RetryPolicy
+from utils.metrics import metrics as default_metrics
+from utils.records import SwapRecord
+
+SOL_MINT = 'So11111111111111111111111111111111111111112'
+LAMPORTS_PER_SOL = 1_000_000_000
+# getSignaturesForAddress returns at most 1000 signatures per call
+MAX_SIGNATURES_PER_CALL = 1000
+
+
+class RpcError(Exception):
+    pass
+
+
+class RpcClient:
+    # Batched Solana JSON-RPC client, the key pool holds RPC endpoint urls so requests spread over several nodes
+    def __init__(self, client, endpoint_pool, retry_policy=None, budget=None, metrics=None):
+        self.client = client
+        self.key_pool = endpoint_pool
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.budget = budget or RequestBudget()
+        self.metrics = metrics or default_metrics
+
+    async def call_batch(self, method, params_list):
+        # one HTTP request with a JSON-RPC call per params, returns the results in order (None for failed calls)
+        payload = [{'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params} for i, params in enumerate(params_list)]
+        for attempt in range(self.retry_policy.max_retries + 1):
+            self.budget.spend()
+            start = time.monotonic()
+            endpoint = await self.key_pool.acquire()
+            self.metrics.record_limiter_wait(method, time.monotonic() - start)
+
+            start = time.monotonic()
+            try:
+                response = await self.client.post(endpoint.key, json=payload)
+            except httpx.TransportError:
+                self.metrics.record_request(method, time.monotonic() - start, 0, None)
+                if attempt == self.retry_policy.max_retries:
+                    raise
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+                continue
+
+            self.metrics.record_request(method, time.monotonic() - start, len(response.content), response.status_code)
+            self.key_pool.report(endpoint, response.status_code, response.headers.get('Retry-After'))
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.retry_policy.max_retries:
+                break
+            if response.status_code != 429:
+                await asyncio.sleep(self.retry_policy.delay(attempt, response.headers.get('Retry-After')))
+        response.raise_for_status()
+
+        data = response.json()
+        if not isinstance(data, list):
+            # nodes that do not accept batch requests answer with a single error object
+            raise RpcError(f"{method} batch rejected: {data.get('error') if isinstance(data, dict) else data}")
+        results = [None] * len(params_list)
+        for item in data:
+            if 'error' not in item:
+                results[item['id']] = item.get('result')
+        return results
+
+    async def call(self, method, params):
+        results = await self.call_batch(method, [params])
+        if results[0] is None:
+            raise RpcError(f'{method} failed')
+        return results[0]
+
+    async def get_signatures(self, account, before=None, until=None, limit=MAX_SIGNATURES_PER_CALL):
+        # newest first, like the Shyft history endpoint
+        options = {'limit': limit}
+        if before:
+            options['before'] = before
+        if until:
+            options['until'] = until
+        return await self.call('getSignaturesForAddress', [account, options])
+
+    async def get_transactions(self, signatures, batch_size, batches_in_flight):
+        # getTransaction in batches of batch_size calls, with several batches in flight, returns signature -> transaction.
+        # Calls that failed inside a batch (e.g. a per-call 429) are retried, RpcError if a transaction is still missing,
+        # since a sync that skipped one would never fetch it again
+        options = {'encoding': 'jsonParsed', 'maxSupportedTransactionVersion': 0}
+        transactions = {}
+        missing = list(signatures)
+        for attempt in range(self.retry_policy.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_policy.delay(attempt - 1))
+            batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+            async for batch, results, error in run_bounded(batches, lambda batch: self.call_batch('getTransaction', [[signature, options] for signature in batch]), batches_in_flight):
+                if error:
+                    raise error
+                transactions.update((signature, tx) for signature, tx in zip(batch, results) if tx is not None)
+            missing = [signature for signature in missing if signature not in transactions]
+            if not missing:
+                return transactions
+        raise RpcError(f'getTransaction failed for {len(missing)} of {len(signatures)} signatures')
+
+
+def account_keys(tx):
+    # jsonParsed encoding returns dicts, json encoding plain strings
+    keys = tx['transaction']['message']['accountKeys']
+    return [key['pubkey'] if isinstance(key, dict) else key for key in keys]
+
+
+def token_balance_changes(meta, owner):
+    # mint -> ui amount change of the owner's token accounts
+    changes = {}
+    for balances, sign in [(meta.get('preTokenBalances') or [], -1), (meta.get('postTokenBalances') or [], 1)]:
+        for balance in balances:
+            if balance.get('owner') != owner:
+                continue
+            amount = balance['uiTokenAmount'].get('uiAmount') or 0
+            changes[balance['mint']] = changes.get(balance['mint'], 0) + sign * amount
+    return changes
+
+
+def parse_rpc_transaction(tx, wallet):
+    # same record as swap_record, derived from the wallet's SOL (native + wrapped) and token balance changes
+    signature = tx['transaction']['signatures'][0]
+    block_time = tx.get('blockTime')
+    meta = tx.get('meta') or {}
+    if meta.get('err') is not None or wallet not in (keys := account_keys(tx)):
+        return SwapRecord(signature, block_time, 'N/A', None, None, None, None, None, None)
+
+    index = keys.index(wallet)
+    # the fee is not part of the swap
+    fee = meta.get('fee', 0) if index == 0 else 0
+    token_changes = token_balance_changes(meta, wallet)
+    sol_change = (meta['postBalances'][index] - meta['preBalances'][index] + fee) / LAMPORTS_PER_SOL + token_changes.pop(SOL_MINT, 0)
+
+    token_changes = {mint: change for mint, change in token_changes.items() if change}
+    if not token_changes:
+        return SwapRecord(signature, block_time, 'N/A', None, None, None, None, None, None)
+    mint = max(token_changes, key=lambda mint: abs(token_changes[mint]))
+    token_change = token_changes[mint]
+
+    if token_change > 0 and sol_change < 0:
+        return SwapRecord(signature, block_time, 'buy', 'SOL', SOL_MINT, -sol_change, None, mint, token_change)
+    if token_change < 0 and sol_change > 0:
+        return SwapRecord(signature, block_time, 'sell', None, mint, -token_change, 'SOL', SOL_MINT, sol_change)
+    return SwapRecord(signature, block_time, 'N/A', None, None, None, None, None, None)
@@ -0,0 +1,79 @@
+from datetime import datetime
+from utils.records import SwapRecord
+
+# the only parts of a history transaction the analyzer reads, everything else is skipped while parsing
+TOKENS_SWAPPED_PREFIX = 'result.item.actions.item.info.tokens_swapped.'
+SCALAR_EVENTS = ('string', 'number', 'boolean', 'null')
+
+
+def parse_timestamp(value):
+    # Shyft's ISO 8601 timestamp (e.g. 2024-11-20T10:15:00.000Z) as epoch seconds
+    return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()) if value else None
+
+
+def transaction_block_time(tx):
+    # raw.blockTime is only there with enable_raw=true, the timestamp field always is
+    return tx.get('raw', {}).get('blockTime') or parse_timestamp(tx.get('timestamp'))
+
+
+def swap_record(signature, block_time, tokens_swapped):
+    # swap record of a Shyft history transaction
+    token_in_info = tokens_swapped.get('in', {})
+    token_out_info = tokens_swapped.get('out', {})
+    token_in_name = token_in_info.get('symbol')
+    type = 'N/A'
+    if token_in_name == 'SOL':
+        type = 'buy'
+    elif token_in_name is not None:
+        type = 'sell'
+    return SwapRecord(
+        signature, block_time, type,
+        token_in_name, token_in_info.get('token_address'), token_in_info.get('amount'),
+        token_out_info.get('symbol'), token_out_info.get('token_address'), token_out_info.get('amount')
+    )
+
+
+class AsyncByteReader:
+    # file-like wrapper around an httpx response, ijson reads the body as it arrives
+    def __init__(self, response):
+        self.chunks = response.aiter_bytes()
+        self.buffer = b''
+
+    async def read(self, size=-1):
+        while not self.buffer:
+            try:
+                self.buffer = await self.chunks.__anext__()
+            except StopAsyncIteration:
+                return b''
+        data, self.buffer = (self.buffer, b'') if size < 0 else (self.buffer[:size], self.buffer[size:])
+        return data
+
+
+async def iter_history_records(response):
+    # SwapRecords of a history page in page order, built from parse events without materializing the page
+    # or the transactions, so raw payloads and every action after the first never end up in memory
+    import ijson
+    signature = block_time = timestamp = None
+    tokens_swapped = {}
+    action_index = -1
+    async for prefix, event, value in ijson.parse_async(AsyncByteReader(response), use_float=True):
+        if prefix == 'result.item':
+            if event == 'start_map':
+                signature = block_time = timestamp = None
+                tokens_swapped = {}
+                action_index = -1
+            elif event == 'end_map':
+                yield swap_record(signature, block_time or parse_timestamp(timestamp), tokens_swapped)
+        elif prefix == 'result.item.signatures.item':
+            signature = signature or value
+        elif prefix == 'result.item.timestamp':
+            timestamp = value
+        elif prefix == 'result.item.raw.blockTime':
+            block_time = value
+        elif prefix == 'result.item.actions.item' and event == 'start_map':
+            action_index += 1
+        elif action_index == 0 and event in SCALAR_EVENTS and prefix.startswith(TOKENS_SWAPPED_PREFIX):
+            # e.g. in.symbol, out.amount
+            side, _, field = prefix[len(TOKENS_SWAPPED_PREFIX):].partition('.')
+            if field and '.' not in field:
+                tokens_swapped.setdefault(side, {})[field] = value
@@ -0,0 +1,56 @@
+import sqlite3
+import time
+
+
+def summary_from_top_trader(trader):
+    # per-token top traders only report totals, without a win rate
+    return {'winPercentage': None, 'total': trader.get('total'), 'totalInvested': trader.get('total_invested')}
+
+
+class WalletSummaryCache:
+    # Persistent wallet -> PnL summary (winPercentage, total, totalInvested) cache with a TTL in seconds,
+    # filled by every endpoint that returns PnL data so the PnL stage can skip wallets it already knows about
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS wallet_summaries (wallet TEXT PRIMARY KEY, win_percentage REAL, total REAL, total_invested REAL, updated_at REAL NOT NULL)')
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def put_many(self, summaries):
+        # a summary without a win rate never replaces one that has it
+        now = time.time()
+        self.conn.executemany(
+            'INSERT INTO wallet_summaries (wallet, win_percentage, total, total_invested, updated_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (wallet) DO UPDATE SET win_percentage = excluded.win_percentage, total = excluded.total, '
+            'total_invested = excluded.total_invested, updated_at = excluded.updated_at '
+            'WHERE excluded.win_percentage IS NOT NULL OR wallet_summaries.win_percentage IS NULL',
+            [(wallet, summary.get('winPercentage'), summary.get('total'), summary.get('totalInvested'), now) for wallet, summary in summaries]
+        )
+        self.conn.commit()
+
+    def put(self, wallet, summary):
+        self.put_many([(wallet, summary)])
+
+    def get(self, wallet):
+        # fresh summary in the same shape as the /pnl/ endpoint's, or None
+        row = self.conn.execute(
+            'SELECT win_percentage, total, total_invested FROM wallet_summaries WHERE wallet = ? AND updated_at >= ?',
+            (wallet, time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'winPercentage': row[0], 'total': row[1], 'totalInvested': row[2]}
+
+    def get_complete(self, wallet):
+        # only summaries with a win rate are enough to judge a wallet without calling /pnl/
+        summary = self.get(wallet)
+        if summary is None or summary['winPercentage'] is None or summary['total'] is None or summary['totalInvested'] is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return summary
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,11 @@
+# heuristic defaults, kept apart from utils.heuristics so reading them does not load pandas
+DEFAULT_THRESHOLDS = {
+    'sniping_window_seconds': 60,   # buying within a minute of launch is sniping
+    'scalp_window_seconds': 120,    # selling within 2 min of the first buy is a scalp
+    'max_scalp_ratio': 0.5,
+    'min_avg_hold_minutes': 20,
+    'max_buys_per_token': 1,
+    'min_trades_per_day': 2,
+    'max_trades_per_day': 5,
+    'max_non_swaps_per_day': 10,    # airdrops and other transfers show up as non swap transactions
+}
@@ -0,0 +1,45 @@
+import sqlite3
+from utils.records import SWAP_RECORD_FIELDS, SwapRecord
+
+TRANSACTION_COLUMNS = list(SWAP_RECORD_FIELDS)
+
+
+class TransactionStore:
+    # Per-wallet parsed transaction rows plus the newest synced signature, so syncs only fetch new transactions
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS wallet_sync (wallet TEXT PRIMARY KEY, newest_signature TEXT, newest_block_time INTEGER)')
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS wallet_transactions (wallet TEXT NOT NULL, {", ".join(TRANSACTION_COLUMNS)}, PRIMARY KEY (wallet, signature))')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS wallet_transactions_block_time ON wallet_transactions (wallet, block_time)')
+        self.conn.commit()
+
+    def get_sync_state(self, wallet):
+        row = self.conn.execute('SELECT newest_signature, newest_block_time FROM wallet_sync WHERE wallet = ?', (wallet,)).fetchone()
+        return row if row else (None, None)
+
+    def add(self, wallet, transactions):
+        # transactions are newest first, as returned by the history endpoint
+        if not transactions:
+            return
+        placeholders = ', '.join(['?'] * (len(TRANSACTION_COLUMNS) + 1))
+        self.conn.executemany(
+            f'INSERT OR IGNORE INTO wallet_transactions (wallet, {", ".join(TRANSACTION_COLUMNS)}) VALUES ({placeholders})',
+            [(wallet,) + tx.to_tuple() for tx in transactions]
+        )
+        self.conn.execute(
+            'INSERT OR REPLACE INTO wallet_sync (wallet, newest_signature, newest_block_time) VALUES (?, ?, ?)',
+            (wallet, transactions[0].signature, transactions[0].block_time)
+        )
+        self.conn.commit()
+
+    def prune(self, wallet, min_block_time):
+        self.conn.execute('DELETE FROM wallet_transactions WHERE wallet = ? AND block_time < ?', (wallet, min_block_time))
+        self.conn.commit()
+
+    def load(self, wallet):
+        # chronological order
+        rows = self.conn.execute(f'SELECT {", ".join(TRANSACTION_COLUMNS)} FROM wallet_transactions WHERE wallet = ? ORDER BY block_time, rowid DESC', (wallet,))
+        return [SwapRecord(*row) for row in rows]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,73 @@
+import sqlite3
+import time
+
+
+class WalletIndex:
+    # Persistent seen-wallet index: dedupes discovered wallets across runs on insert and remembers
+    # when each wallet was first seen, last seen, last fully checked and first found profitable
+    def __init__(self, path, recheck_interval):
+        self.recheck_interval = recheck_interval
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS seen_wallets (wallet TEXT PRIMARY KEY, first_seen REAL NOT NULL, last_seen REAL NOT NULL, last_checked REAL, profitable_at REAL)')
+        self.conn.commit()
+        self.run_started_at = time.time()
+
+    def see(self, wallet):
+        # returns (new, due): new if the wallet was never seen before, due if it should be evaluated in this run,
+        # i.e. it was not already seen in this run and was not checked within the recheck interval
+        _, new, due = self.see_many([wallet])[0]
+        return new, due
+
+    def see_many(self, wallets):
+        # see() for a whole page of wallets with one lookup per chunk and one commit, returns (wallet, new, due)
+        # for every wallet in order, a wallet repeated in the page is not new and not due the second time
+        now = time.time()
+        unique = list(dict.fromkeys(wallets))
+        rows = {}
+        for i in range(0, len(unique), 500):
+            chunk = unique[i:i + 500]
+            rows.update((wallet, (last_seen, last_checked)) for wallet, last_seen, last_checked in self.conn.execute(
+                f'SELECT wallet, last_seen, last_checked FROM seen_wallets WHERE wallet IN ({", ".join(["?"] * len(chunk))})', chunk
+            ))
+        results = []
+        inserts = []
+        updates = []
+        seen = set()
+        for wallet in wallets:
+            row = rows.get(wallet)
+            if wallet in seen or (row is not None and row[0] >= self.run_started_at):
+                results.append((wallet, False, False))
+            elif row is None:
+                inserts.append((wallet, now, now))
+                results.append((wallet, True, True))
+            else:
+                updates.append((now, wallet))
+                results.append((wallet, False, row[1] is None or row[1] < now - self.recheck_interval))
+            seen.add(wallet)
+        self.conn.executemany('INSERT INTO seen_wallets (wallet, first_seen, last_seen) VALUES (?, ?, ?)', inserts)
+        self.conn.executemany('UPDATE seen_wallets SET last_seen = ? WHERE wallet = ?', updates)
+        self.conn.commit()
+        return results
+
+    def mark_checked(self, wallets):
+        now = time.time()
+        self.conn.executemany(
+            'INSERT INTO seen_wallets (wallet, first_seen, last_seen, last_checked) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (wallet) DO UPDATE SET last_checked = excluded.last_checked',
+            [(wallet, now, now, now) for wallet in wallets]
+        )
+        self.conn.commit()
+
+    def mark_profitable(self, wallet):
+        # returns True the first time a wallet is found profitable
+        now = time.time()
+        cursor = self.conn.execute(
+            'INSERT INTO seen_wallets (wallet, first_seen, last_seen, profitable_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (wallet) DO UPDATE SET profitable_at = excluded.profitable_at WHERE seen_wallets.profitable_at IS NULL',
+            (wallet, now, now, now)
+        )
+        self.conn.commit()
+        return cursor.rowcount > 0
+
+    def close(self):
+        self.conn.close()